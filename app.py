@@ -1,42 +1,108 @@
+import time
+
+STARTED = time.perf_counter()  # Referencia para medir el tiempo hasta la primera pintura
+
+import importlib
 import tkinter as tk
-from tkinter import filedialog, messagebox
-from tkinterdnd2 import TkinterDnD, DND_FILES
-import cv2
-from PIL import Image, ImageTk
+from tkinter import filedialog, messagebox, ttk
 import threading
-import time
 
-def format_time(seconds):
-    """Convierte segundos a formato Minutos:Segundos."""
-    seconds = int(seconds)  # Convertir a entero para evitar errores de formato
-    minutes = seconds // 60
-    seconds = seconds % 60
-    return f"{minutes}:{seconds:02d}"  # Formato mm:ss
-
-def threaded(func):
-    """Decorador para ejecutar una función en un hilo separado."""
-    def wrapper(*args, **kwargs):
-        thread = threading.Thread(target=func, args=args, kwargs=kwargs)
-        thread.daemon = True
-        thread.start()
-        return thread
-    return wrapper
+from tkinterdnd2 import TkinterDnD, DND_FILES  # Ligero: solo carga la extensión tkdnd al crear la raíz
+from layout import PREVIEW_SIZE, STRIP_SIZE
+from ui_dispatch import UIDispatcher
+from tasks import TaskScheduler
+from media_info import probe
+from timeline import TimelineModel
+import instrument
+
+# Módulos pesados (OpenCV, NumPy, PIL y los que dependen de ellos);
+# se importan en segundo plano después de pintar la ventana
+HEAVY_MODULES = ("numpy", "cv2", "PIL.ImageTk", "playback", "decoder", "display", "seek_index",
+                 "proxy", "filmstrip", "scenes", "waveform", "scrub", "export_queue", "backup")
+
+
+def import_heavy_modules():
+    """Importa los módulos pesados midiendo cada uno y publica sus nombres en este módulo."""
+    global np, Image, ImageTk, PlaybackEngine, open_decoder, DisplaySurface
+    global SeekIndex, load_seek_index, build_proxy, proxy_keyframes, Filmstrip, load_scene_cuts, load_waveform
+    global ScrubPreview, DEFAULT_CACHE_BYTES, ExportQueue, rangos_desde_clips, PERFILES, PERFIL_POR_DEFECTO
+
+    for name in HEAVY_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        elapsed = time.perf_counter() - started
+        instrument.record("import", elapsed)
+        instrument.debug("Importado %s en %.1f ms", name, elapsed * 1000)
+
+    import numpy as np
+    from PIL import Image, ImageTk
+    from playback import PlaybackEngine
+    from decoder import open_decoder
+    from display import DisplaySurface
+    from seek_index import SeekIndex, load_seek_index
+    from proxy import build_proxy, proxy_keyframes
+    from filmstrip import Filmstrip
+    from scenes import load_scene_cuts
+    from waveform import load_waveform
+    from scrub import ScrubPreview, DEFAULT_CACHE_BYTES
+    from export_queue import ExportQueue, rangos_desde_clips
+    from backup import PERFILES, PERFIL_POR_DEFECTO
+
+
+HANDLE_WIDTH = 15  # Ancho de los manejadores de la línea de tiempo
+ZOOM_STEP = 1.25  # Factor de zoom por paso de la rueda del ratón
+PAN_STEP = 40  # Píxeles desplazados por paso de la rueda con Shift
+
+def format_time(seconds, decimals=0):
+    """Convierte segundos a formato Minutos:Segundos (con `decimals` decimales)."""
+    scale = 10 ** decimals
+    seconds = int(max(0.0, seconds) * scale) / scale  # Truncar para no mostrar 60 segundos
+    minutes, seconds = divmod(seconds, 60)
+    if decimals:
+        return f"{int(minutes)}:{seconds:0{decimals + 3}.{decimals}f}"
+    return f"{int(minutes)}:{int(seconds):02d}"  # Formato mm:ss
 
 class ClipEditorApp:
-    def __init__(self, root):
+    def __init__(self, root, scrub_cache_bytes=None, use_proxy=True, show_overlay=False, decoder=None):
         self.timeline_locked = True  # Bloquear línea de tiempo al inicio
         self.root = root
         self.root.title("Editor de Clips con Arrastrar y Soltar")
         self.root.geometry("900x700")
 
+        # Todas las actualizaciones de la interfaz desde hilos pasan por aquí
+        self.ui = UIDispatcher(self.root)
+        # Grupo fijo de hilos; cada categoría cancela su tarea anterior. Los análisis
+        # largos van a su propio grupo para no retrasar los saltos y la reproducción
+        self.tasks = TaskScheduler(workers=4, background=("index", "filmstrip", "scenes", "waveform", "proxy"))
+
         # Variables globales
         self.video_path = None
-        self.cap = None
-        self.running = False
-        self.video_thread = None
+        self.decoder = None  # Decodificador de la previsualización (ver decoder.py)
+        self.decoder_backend = decoder  # "cv2", "ffmpeg" o None para DEFAULT_DECODER
+        self.preview_path = None  # Archivo que decodifica la previsualización (original o proxy)
+        self.use_proxy = use_proxy
+        self.source_index = None  # Índice de búsqueda del archivo original
+        self.seek_index = None  # Índice usado por la previsualización
+        self.filmstrip = None
+        self.scrubber = None
+        self.scrub_cache_bytes = scrub_cache_bytes  # None: DEFAULT_CACHE_BYTES de scrub
+        self.scrub_target = None
+        self.waveform = None
+        self.media = None  # MediaInfo del video abierto
+        self.timeline = TimelineModel(STRIP_SIZE[0])
+        self.scene_items = []  # Marcas de los cortes de escena en el canvas
+        self.drawn_version = -1  # Versión de la vista ya dibujada
+        self.play_token = None  # Token de la reproducción en curso
+        self.seek_requested_at = None  # Instante del último salto pendiente de mostrar
         self.lock = threading.Lock()
+        self.ready = False  # True cuando los módulos pesados están cargados
+        self.playback = None  # Se crean en attach_media()
+        self.display = None
+        self.export_queue = None
+        self.start_frame = 0
+        self.end_frame = 1  # Exclusivo
         self.start_pos = 0
-        self.end_pos = 100
+        self.end_pos = 0
         self.selected_clip = None
         self.clip_data = {"clip1": {"start": 0, "end": 0}, "clip2": {"start": 0, "end": 0}, "clip3": {"start": 0, "end": 0}}
 
@@ -44,6 +110,12 @@ class ClipEditorApp:
         self.preview_label = tk.Label(self.root, bg="black", width=800, height=400)
         self.preview_label.pack(pady=10)
 
+        # Superposición opcional con fps, descartes y latencia de salto (F10)
+        self.overlay = tk.Label(self.root, bg="black", fg="lime", font=("Courier", 9), justify="left", anchor="nw")
+        self.overlay_visible = False
+        self.overlay_job = None
+        self.show_overlay = show_overlay
+
         # Mensaje inicial
         self.show_placeholder_message()
 
@@ -51,12 +123,20 @@ class ClipEditorApp:
         self.time_frame = tk.Frame(self.root, bg="white", relief="flat", bd=1)
         self.time_frame.pack(pady=5)
 
-        self.time_scale = tk.Canvas(self.time_frame, width=800, height=20, bg="lightgray", bd=0, highlightthickness=1, highlightbackground="black")
+        strip_width, strip_height = STRIP_SIZE
+        self.time_scale = tk.Canvas(self.time_frame, width=strip_width, height=strip_height, bg="lightgray", bd=0, highlightthickness=1, highlightbackground="black")
         self.time_scale.pack(pady=5)
 
+        # Tira de miniaturas detrás de los manejadores
+        self.filmstrip_item = self.time_scale.create_image(0, 0, anchor="nw")
+        self.filmstrip_image = None
+        # Forma de onda del audio sobre la tira, también detrás de los manejadores
+        self.waveform_item = self.time_scale.create_image(0, 0, anchor="nw")
+        self.waveform_image = None
+
         # Dibujar los manejadores estilizados
-        self.start_handle = self.time_scale.create_rectangle(0, 2, 15, 18, fill="#007BFF", outline="black", tags="start")  # Azul
-        self.end_handle = self.time_scale.create_rectangle(785, 2, 800, 18, fill="#FF4136", outline="black", tags="end")  # Rojo
+        self.start_handle = self.time_scale.create_rectangle(0, 2, HANDLE_WIDTH, strip_height - 2, fill="#007BFF", outline="black", tags="start")  # Azul
+        self.end_handle = self.time_scale.create_rectangle(strip_width - HANDLE_WIDTH, 2, strip_width, strip_height - 2, fill="#FF4136", outline="black", tags="end")  # Rojo
 
         # Conectar eventos de los deslizadores
         self.time_scale.tag_bind("start", "<B1-Motion>", self.move_start_handle)
@@ -64,6 +144,18 @@ class ClipEditorApp:
         self.time_scale.tag_bind("end", "<B1-Motion>", self.move_end_handle)
         self.time_scale.tag_bind("end", "<ButtonRelease-1>", self.sync_video_with_end)
 
+        # Zoom con la rueda y desplazamiento con Shift + rueda
+        self.time_scale.bind("<MouseWheel>", self.on_timeline_wheel)
+        self.time_scale.bind("<Shift-MouseWheel>", self.on_timeline_wheel)
+        self.time_scale.bind("<Button-4>", self.on_timeline_wheel)
+        self.time_scale.bind("<Button-5>", self.on_timeline_wheel)
+        self.time_scale.bind("<Shift-Button-4>", self.on_timeline_wheel)
+        self.time_scale.bind("<Shift-Button-5>", self.on_timeline_wheel)
+
+        self.snap_keyframes = tk.BooleanVar(value=False)
+        self.snap_check = tk.Checkbutton(self.time_frame, text="Ajustar a fotogramas clave", variable=self.snap_keyframes, bg="white")
+        self.snap_check.pack()
+
         self.speed_slider = tk.Scale(
             self.root,
             from_=0.5,  # 50% de velocidad (más lento)
@@ -87,50 +179,85 @@ class ClipEditorApp:
             self.create_clip_box(f"Clip {i}", f"clip{i}")
 
         # Botón para cargar video
-        self.load_button = tk.Button(self.root, text="Cargar Video", command=self.load_video)
+        self.load_button = tk.Button(self.root, text="Cargar Video", command=self.load_video, state="disabled")
         self.load_button.pack(pady=10)
 
-        # Configuración de arrastrar y soltar
+        # Exportación en segundo plano con barra de progreso
+        self.export_frame = tk.Frame(self.root)
+        self.export_frame.pack(pady=5)
+        self.export_button = tk.Button(self.export_frame, text="Exportar Clips", command=self.export_clips, state="disabled")
+        self.export_button.pack(side=tk.LEFT, padx=5)
+        self.export_profile = ttk.Combobox(self.export_frame, state="readonly", width=12)
+        self.export_profile.pack(side=tk.LEFT, padx=5)
+        self.export_progress = ttk.Progressbar(self.export_frame, length=300, maximum=1.0, mode="determinate")
+        self.export_progress.pack(side=tk.LEFT, padx=5)
+        self.export_status = tk.Label(self.export_frame, text="Sin exportaciones", width=30, anchor="w")
+        self.export_status.pack(side=tk.LEFT, padx=5)
+        self.cancel_export_button = tk.Button(self.export_frame, text="Cancelar", state="disabled")
+        self.cancel_export_button.pack(side=tk.LEFT, padx=5)
+
+        # Al cerrar, cancelar las tareas para que el proceso no espere a que terminen
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # OpenCV, NumPy y PIL se cargan sin bloquear la primera pintura
+        threading.Thread(target=self.load_modules, daemon=True).start()
+
+    def load_modules(self):
+        """Importa los módulos pesados fuera del hilo de Tk y completa la ventana al terminar."""
+        started = time.perf_counter()
+        try:
+            import_heavy_modules()
+        except Exception as e:
+            instrument.error("Error al cargar los módulos: %s", e)
+            self.ui.post(messagebox.showerror, "Error", f"No se pudieron cargar los módulos: {e}")
+            return
+        instrument.info("Módulos cargados en %.0f ms", (time.perf_counter() - started) * 1000)
+        self.ui.post(self.attach_media)
+
+    def attach_media(self):
+        """Crea las partes que dependen de los módulos pesados y activa la interfaz (hilo de Tk)."""
+        if self.scrub_cache_bytes is None:
+            self.scrub_cache_bytes = DEFAULT_CACHE_BYTES
+        self.playback = PlaybackEngine(capacity=8, size=PREVIEW_SIZE, lock=self.lock)
+        self.playback.set_speed(float(self.speed_slider.get()))  # El slider se movió antes de crear el motor
+        self.display = DisplaySurface(self.preview_label, PREVIEW_SIZE)
+
+        self.export_queue = ExportQueue()
+        self.export_profile.config(values=list(PERFILES))
+        self.export_profile.set(PERFIL_POR_DEFECTO)
+        self.cancel_export_button.config(command=self.export_queue.cancelar, state="normal")
+        self.export_button.config(state="normal")
+        self.load_button.config(state="normal")
+        self.poll_export_progress()
+
+        # Configuración de arrastrar y soltar (la raíz debe ser TkinterDnD.Tk)
         self.root.drop_target_register(DND_FILES)
         self.root.dnd_bind('<<Drop>>', self.on_drop)
 
-    def update_start_handle(self, x):
-        """Actualiza la posición del manejador de inicio sin alterar su tamaño."""
-        # Obtén las coordenadas actuales del deslizador
-        _, y1, _, y2 = self.time_scale.coords(self.start_handle)
-        width = 15  # Ancho del deslizador (mantenido constante)
-
-        # Actualiza solo la posición x
-        self.time_scale.coords(self.start_handle, x, y1, x + width, y2)
-        
-        # Calcula la posición en segundos
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        self.start_pos = (x / 800) * (total_frames / fps)  # Escalar x al rango de frames y convertir a segundos
-        
-        print(f"Inicio actualizado a: {self.start_pos:.2f} segundos")
-
-
-    def update_end_handle(self, x):
-        """Actualiza la posición del manejador de fin sin alterar su tamaño."""
-        # Obtén las coordenadas actuales del deslizador
-        _, y1, _, y2 = self.time_scale.coords(self.end_handle)
-        width = 15  # Ancho del deslizador (constante)
-
-        # Verifica límites para evitar que el deslizador de fin pase al inicio
-        start_x = self.time_scale.coords(self.start_handle)[2]  # Borde derecho del deslizador de inicio
-        if x - width <= start_x:
-            x = start_x + width  # Ajusta la posición para no sobrepasar el deslizador de inicio
-
-        # Actualiza solo la posición x
-        self.time_scale.coords(self.end_handle, x - width, y1, x, y2)
-
-        # Calcula la posición en segundos
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        self.end_pos = (x / 800) * (total_frames / fps)  # Escalar x al rango de frames y convertir a segundos
-        
-        print(f"Fin actualizado a: {self.end_pos:.2f} segundos")
+        # Vista de depuración de tareas
+        self.root.bind("<F12>", self.show_task_debug)
+        self.root.bind("<F10>", self.toggle_overlay)
+        if self.show_overlay:
+            self.toggle_overlay()
+
+        self.ready = True
+        instrument.info("Editor listo en %.0f ms", (time.perf_counter() - STARTED) * 1000)
+
+    def on_close(self):
+        """Cancela la reproducción y todas las tareas en curso antes de destruir la ventana."""
+        if self.play_token:
+            self.play_token.cancel()
+        if self.playback:
+            self.playback.stop()
+        if self.scrubber:
+            self.scrubber.close()
+        self.tasks.shutdown(wait=False)
+        self.root.destroy()
+
+    @property
+    def playing(self):
+        """Indica si hay una reproducción en curso que no se ha cancelado."""
+        return self.play_token is not None and not self.play_token.cancelled
 
     def show_placeholder_message(self):
         """Muestra un mensaje o imagen de bienvenida en la ventana de previsualización."""
@@ -155,226 +282,481 @@ class ClipEditorApp:
         self.video_path = file_path
         self.load_video()
 
-    @threaded
     def load_video(self):
         """Carga un video desde un archivo."""
-        print(f"Cargando video: {self.video_path}")
-        self.stop_video_thread()
-        if self.cap:
-            self.cap.release()
-
-        self.cap = cv2.VideoCapture(self.video_path)
-        if not self.cap.isOpened():
-            print("Error: No se pudo abrir el video.")
-            messagebox.showerror("Error", "No se pudo abrir el video.")
+        if self.play_token:
+            self.play_token.cancel()
+        self.tasks.cancel("seek")
+        self.tasks.submit("load", self.open_video, self.video_path)
+
+    def open_video(self, token, video_path):
+        """Abre el video en un hilo del planificador."""
+        instrument.info("Cargando video: %s", video_path)
+        self.playback.stop()
+        with self.lock:
+            if self.decoder:
+                self.decoder.release()
+            self.decoder = open_decoder(video_path, PREVIEW_SIZE, self.decoder_backend)
+            self.preview_path = video_path
+        if not self.decoder.is_open():
+            instrument.error("No se pudo abrir el video: %s", video_path)
+            self.ui.post(messagebox.showerror, "Error", "No se pudo abrir el video.")
+            return
+        if token.cancelled:
             return
 
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        video_duration = total_frames / fps  # Duración total en segundos
-
-        # Inicializar posiciones
-        self.start_pos = 0
-        self.end_pos = video_duration
+        # El decodificador ya entrega los fotogramas girados según los metadatos
+        self.media = self.decoder.info
 
-        # Actualizar solo los valores internos, sin redibujar los recuadros
+        # Antes de lanzar las tareas, para que sus resultados lleguen después del reinicio
         self.timeline_locked = True
         self.selected_clip = None
+        self.ui.post(self.reset_timeline, self.media)
+
+        self.source_index = None
+        self.seek_index = None
+        if self.scrubber:
+            self.scrubber.close()
+        self.scrubber = ScrubPreview(video_path, self.on_scrub_frame, self.scrub_cache_bytes, decoder=self.decoder_backend)
+        self.tasks.submit("index", self.build_seek_index, video_path)
+        if self.use_proxy:
+            # Justo después del índice: el proxy es lo que más tarda y lo que más
+            # acelera la edición, no debe esperar a escenas y forma de onda
+            self.tasks.submit("proxy", self.build_proxy, video_path)
+        self.tasks.submit("filmstrip", self.build_filmstrip, video_path)
+        self.tasks.submit("scenes", self.detect_scene_cuts, video_path)
+        self.tasks.submit("waveform", self.build_waveform, video_path)
+
+        instrument.debug("Línea de tiempo bloqueada. Selecciona un clip para desbloquear.")
+        self.show_first_frame()
+
+    def reset_timeline(self, media):
+        """Restablece la línea de tiempo y los recuadros de clips tras cargar un video (hilo de Tk)."""
+        self.timeline.set_media(media)
+        self.waveform = None
+        self.show_waveform(None)
+        self.start_frame = 0
+        self.end_frame = media.frame_count
+        self.start_pos = 0
+        self.end_pos = media.duration
+        self.show_scene_cuts([])
+        self.redraw_timeline()
+        # Los rangos del video anterior no valen para el nuevo: vaciar los clips
         for key, frame in self.clip_buttons.items():
+            self.clip_data[key] = {"start": 0, "end": 0}
             frame.config(highlightbackground="black", highlightthickness=2)
             frame.start_label.config(text="Inicio: 0:00")
-            frame.end_label.config(text=f"Final: {format_time(video_duration)}")
+            frame.end_label.config(text="Final: 0:00")
+
+    def on_index_ready(self, index):
+        """Pasa a la línea de tiempo los PTS y fotogramas clave del índice (hilo de Tk)."""
+        at_end = self.end_frame >= self.timeline.frame_count
+        self.timeline.set_index(index)
+        if at_end or self.end_frame > self.timeline.frame_count:
+            self.end_frame = self.timeline.frame_count
+        self.start_frame = min(self.start_frame, self.end_frame - 1)
+        self.start_pos = self.timeline.frame_to_time(self.start_frame)
+        self.end_pos = self.timeline.frame_to_time(self.end_frame)
+        self.redraw_timeline()
+
+    def build_seek_index(self, token, video_path):
+        """Construye (o carga de la caché) el índice de búsqueda del video en segundo plano."""
+        try:
+            index = load_seek_index(video_path, token)
+        except Exception as e:
+            instrument.error("Error al construir el índice de búsqueda: %s", e)
+            return
+        if index is not None and not token.cancelled and video_path == self.video_path:
+            self.source_index = index
+            self.seek_index = self.preview_index(index)
+            if self.scrubber:
+                self.scrubber.seek_index = self.seek_index
+            self.ui.post(self.on_index_ready, index)
+            instrument.info("Índice de búsqueda listo: %d fotogramas, %d clave.", len(index), len(index.keyframes))
+
+    def preview_index(self, index):
+        """Índice de búsqueda del archivo que decodifica la previsualización."""
+        if self.preview_path == self.video_path:
+            return index
+        # El proxy conserva los PTS del original pero tiene su propio GOP
+        return SeekIndex(index.pts, proxy_keyframes(len(index)))
+
+    def build_proxy(self, token, video_path):
+        """Genera (o recupera de la caché) el proxy del video y cambia la previsualización a él."""
+        try:
+            path = build_proxy(video_path, token)
+        except Exception as e:
+            instrument.error("Error al generar el proxy: %s", e)
+            return
+        # build_proxy devuelve el propio video si ya es de baja resolución
+        if path and path != video_path and not token.cancelled and video_path == self.video_path:
+            self.switch_preview_source(path)
+
+    def switch_preview_source(self, path):
+        """Cambia el decodificador de la previsualización a `path` conservando la posición."""
+        decoder = open_decoder(path, PREVIEW_SIZE, self.decoder_backend)
+        if not decoder.is_open():
+            instrument.error("No se pudo abrir el proxy %s.", path)
+            return
 
-        print("Línea de tiempo bloqueada. Selecciona un clip para desbloquear.")
-        self.show_first_frame()
+        was_playing = self.playing
+        if was_playing:
+            self.play_token.cancel()
+        self.playback.stop()
+        with self.lock:
+            position = self.decoder.position
+            self.decoder.release()
+            self.decoder = decoder
+            self.preview_path = path
+            decoder.seek(position)
+        if self.source_index:
+            self.seek_index = self.preview_index(self.source_index)
+
+        if self.scrubber:
+            self.scrubber.close()
+        self.scrubber = ScrubPreview(path, self.on_scrub_frame, self.scrub_cache_bytes, decoder=self.decoder_backend)
+        self.scrubber.seek_index = self.seek_index
+        instrument.info("Previsualización usando el proxy: %s", path)
+
+        if was_playing:
+            self.tasks.submit("seek", self.seek_video, position)
+
+    def build_filmstrip(self, token, video_path):
+        """Genera la tira de miniaturas de forma progresiva en segundo plano."""
+        self.filmstrip = Filmstrip(video_path, cancelled=token)
+        self.ui.post(self.show_filmstrip, None, key="filmstrip")
+        try:
+            self.filmstrip.generate(lambda strip: self.ui.post(self.show_filmstrip, strip, key="filmstrip"))
+        except Exception as e:
+            instrument.error("Error al generar la tira de miniaturas: %s", e)
 
+    def detect_scene_cuts(self, token, video_path):
+        """Detecta (o carga de la caché) los cortes de escena en segundo plano."""
+        try:
+            cuts = load_scene_cuts(video_path, token)
+        except Exception as e:
+            instrument.error("Error al detectar los cortes de escena: %s", e)
+            return
+        if cuts is None or token.cancelled or video_path != self.video_path:
+            return
+        self.ui.post(self.show_scene_cuts, cuts, key="scenes")
+        instrument.info("Cortes de escena detectados: %d", len(cuts))
+
+    def show_scene_cuts(self, cuts):
+        """Crea una marca por cada corte de escena sobre la tira de miniaturas (hilo de Tk)."""
+        self.timeline.scene_cuts = cuts
+        self.time_scale.delete("scene")
+        height = STRIP_SIZE[1]
+        self.scene_items = [self.time_scale.create_line(0, 0, 0, height, fill="yellow", tags="scene") for _ in cuts]
+        self.time_scale.tag_raise("start")
+        self.time_scale.tag_raise("end")
+        self.drawn_version = -1  # Colocar las marcas nuevas en el próximo redibujado
+        self.redraw_timeline()
+
+    def redraw_timeline(self):
+        """
+        Recoloca los elementos del canvas según la vista del modelo (hilo de Tk).
+
+        Las marcas, la forma de onda y la tira solo se actualizan si la vista
+        cambió; al arrastrar un manejador se mueve únicamente ese elemento.
+        """
+        self.place_start_handle()
+        self.place_end_handle()
+        if self.drawn_version == self.timeline.version:
+            return
+        self.drawn_version = self.timeline.version
+        height = STRIP_SIZE[1]
+        for item, frame in zip(self.scene_items, self.timeline.scene_cuts):
+            x = self.timeline.frame_to_x(frame)
+            self.time_scale.coords(item, x, 0, x, height)
+        # La tira de miniaturas cubre el video completo: ocultarla con zoom
+        self.time_scale.itemconfig(self.filmstrip_item, state="hidden" if self.timeline.zoomed else "normal")
+        self.redraw_waveform()
+
+    def place_start_handle(self):
+        x = self.timeline.frame_to_x(self.start_frame)
+        self.time_scale.coords(self.start_handle, x, 2, x + HANDLE_WIDTH, STRIP_SIZE[1] - 2)
+
+    def place_end_handle(self):
+        x = self.timeline.frame_to_x(self.end_frame)
+        self.time_scale.coords(self.end_handle, x - HANDLE_WIDTH, 2, x, STRIP_SIZE[1] - 2)
+
+    def on_timeline_wheel(self, event):
+        """Zoom alrededor del cursor con la rueda; desplazamiento con Shift + rueda."""
+        if not self.media:
+            return
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        if event.state & 0x0001:  # Shift
+            changed = self.timeline.pan(-PAN_STEP if up else PAN_STEP)
+        else:
+            changed = self.timeline.zoom(ZOOM_STEP if up else 1 / ZOOM_STEP, event.x)
+        if changed:
+            self.redraw_timeline()
+
+    def build_waveform(self, token, video_path):
+        """Extrae (o carga de la caché) los picos de audio en segundo plano."""
+        try:
+            if probe(video_path).has_audio is False:
+                return  # Sin pista de audio no hay nada que extraer
+            waveform = load_waveform(video_path, token)
+        except Exception as e:
+            instrument.error("Error al extraer la forma de onda: %s", e)
+            return
+        if waveform is None or token.cancelled or video_path != self.video_path:
+            return
+        self.ui.post(self.set_waveform, waveform, key="waveform")
+
+    def set_waveform(self, waveform):
+        """Guarda los picos de audio y los dibuja (hilo de Tk)."""
+        self.waveform = waveform
+        self.redraw_waveform()
+
+    def redraw_waveform(self):
+        """Dibuja la parte visible de la forma de onda al nivel de detalle del zoom (hilo de Tk)."""
+        if self.waveform:
+            width, height = STRIP_SIZE
+            self.show_waveform(self.waveform.render(width, height, *self.timeline.visible_seconds()))
+
+    def show_waveform(self, image):
+        """Dibuja la forma de onda RGBA sobre la tira de miniaturas (hilo de Tk)."""
+        if image is None:
+            self.waveform_image = None
+            self.time_scale.itemconfig(self.waveform_item, image="")
+            return
+        self.waveform_image = ImageTk.PhotoImage(image=Image.fromarray(image, "RGBA"))
+        self.time_scale.itemconfig(self.waveform_item, image=self.waveform_image)
+        self.time_scale.tag_raise(self.waveform_item, self.filmstrip_item)
+
+    def show_filmstrip(self, strip):
+        """Dibuja la tira de miniaturas en la línea de tiempo (hilo de Tk)."""
+        if strip is None:
+            self.filmstrip_image = None
+            self.time_scale.itemconfig(self.filmstrip_item, image="")
+            return
+        self.filmstrip_image = ImageTk.PhotoImage(image=Image.fromarray(strip))
+        self.time_scale.itemconfig(self.filmstrip_item, image=self.filmstrip_image)
+        self.time_scale.tag_lower(self.filmstrip_item)
 
     def show_first_frame(self):
         """Muestra el primer fotograma del video."""
-        print("Mostrando primer fotograma.")
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        ret, frame = self.cap.read()
+        instrument.debug("Mostrando primer fotograma.")
+        width, height = PREVIEW_SIZE
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        with self.lock:
+            self.decoder.seek(0)
+            ret = self.decoder.read_into(frame)
         if ret:
-            self.display_frame(frame)
-
-    def display_frame(self, frame):
-        """Muestra el fotograma en la ventana."""
-        # Rotar el fotograma si está de cabeza
-        frame = cv2.rotate(frame, cv2.ROTATE_180)  # Rotar 180 grados si es necesario
-        
-        frame = cv2.resize(frame, (800, 400))
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = ImageTk.PhotoImage(image=Image.fromarray(frame))
-        self.preview_label.config(image=img)
-        self.preview_label.image = img
+            self.ui.post(self.display_rgb, frame, key="frame")
+
+    def display_rgb(self, frame):
+        """Muestra un fotograma RGB ya preparado al tamaño de la previsualización."""
+        self.display.show(frame)
 
     def move_start_handle(self, event):
         """Mueve el manejador de inicio."""
         if self.timeline_locked or not self.selected_clip:
-            print("Línea de tiempo bloqueada. Selecciona un clip para desbloquear.")
+            instrument.debug("Línea de tiempo bloqueada. Selecciona un clip para desbloquear.")
             return
 
-        x = event.x
-        end_x = self.time_scale.coords(self.end_handle)[0]  # Posición actual del deslizador de fin
-        handle_width = 15  # Ancho del deslizador
-
-        if 0 <= x <= end_x - handle_width:
-            self.update_start_handle(x)  # Actualiza la posición del deslizador
+        frame = self.timeline.snap(self.timeline.x_to_frame(event.x), self.snap_keyframes.get())
+        frame = min(frame, self.end_frame - 1)
+        if frame != self.start_frame:
+            self.update_start_handle(frame)
             self.update_clip_values()   # Actualiza los valores del clip seleccionado
-        else:
-            print(f"[START HANDLE] Movimiento inválido: {x} está fuera de rango.")
-
+            self.request_scrub_frame(frame)
 
     def move_end_handle(self, event):
         """Mueve el manejador de fin."""
         if self.timeline_locked or not self.selected_clip:
-            print("Línea de tiempo bloqueada. Selecciona un clip para desbloquear.")
+            instrument.debug("Línea de tiempo bloqueada. Selecciona un clip para desbloquear.")
             return
 
-        x = event.x
-        start_x = self.time_scale.coords(self.start_handle)[2]  # Borde derecho del deslizador de inicio
-        handle_width = 15  # Ancho del deslizador
-
-        if start_x + handle_width <= x <= 800:
-            self.update_end_handle(x)  # Actualiza la posición del deslizador
+        last = self.timeline.frame_count
+        frame = self.timeline.snap(self.timeline.x_to_frame(event.x, last), self.snap_keyframes.get())
+        frame = max(frame, self.start_frame + 1)
+        if frame != self.end_frame:
+            self.update_end_handle(frame)
             self.update_clip_values()  # Actualiza los valores del clip seleccionado
-        else:
-            print(f"[END HANDLE] Movimiento inválido: {x} está fuera de rango.")
-
-
-    def update_start_handle(self, x):
-        """Actualiza la posición del manejador de inicio."""
-        # Mantén las dimensiones del deslizador constantes
-        _, y1, _, y2 = self.time_scale.coords(self.start_handle)
-        width = 15  # Ancho del deslizador (mantenido constante)
-
-        print(f"[UPDATE START] Antes de actualizar: {self.time_scale.coords(self.start_handle)}")
-
-        # Actualiza solo la posición x
-        self.time_scale.coords(self.start_handle, x, y1, x + width, y2)
-
-        print(f"[UPDATE START] Después de actualizar: {self.time_scale.coords(self.start_handle)}")
-
-        # Calcula la posición en segundos
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        self.start_pos = (x / 800) * (total_frames / fps)  # Escalar x al rango de frames y convertir a segundos
-        
-        print(f"[UPDATE START] Nueva posición: {self.start_pos:.2f} segundos")
-
-    def update_end_handle(self, x):
-        """Actualiza la posición del manejador de fin."""
-        # Mantén las dimensiones del deslizador constantes
-        _, y1, _, y2 = self.time_scale.coords(self.end_handle)
-        width = 15  # Ancho del deslizador (mantenido constante)
-
-        print(f"[UPDATE END] Antes de actualizar: {self.time_scale.coords(self.end_handle)}")
-
-        # Actualiza solo la posición x
-        self.time_scale.coords(self.end_handle, x - width, y1, x, y2)
-
-        print(f"[UPDATE END] Después de actualizar: {self.time_scale.coords(self.end_handle)}")
-
-        # Calcula la posición en segundos
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        self.end_pos = (x / 800) * (total_frames / fps)  # Escalar x al rango de frames y convertir a segundos
-        
-        print(f"[UPDATE END] Nueva posición: {self.end_pos:.2f} segundos")
-
-
-
-    @threaded
-    def stop_video_thread(self):
-        """Detiene cualquier hilo de reproducción activo."""
-        if self.running:
-            print("Deteniendo reproducción de video.")
-            self.running = False
-            if self.video_thread and self.video_thread.is_alive():
-                self.video_thread.join()
-            print("Hilo de reproducción detenido.")
+            self.request_scrub_frame(min(frame, last - 1))
+
+    def update_start_handle(self, frame):
+        """Mueve el manejador de inicio al fotograma `frame`."""
+        self.start_frame = frame
+        self.start_pos = self.timeline.frame_to_time(frame)
+        self.place_start_handle()
+
+    def update_end_handle(self, frame):
+        """Mueve el manejador de fin al fotograma `frame` (exclusivo)."""
+        self.end_frame = frame
+        self.end_pos = self.timeline.frame_to_time(frame)
+        self.place_end_handle()
+
+    def request_scrub_frame(self, frame):
+        """Pide a la previsualización de arrastre el fotograma `frame`."""
+        if not self.scrubber or self.playing:
+            return
+        self.scrub_target = frame
+        self.scrubber.request(frame)
+
+    def on_scrub_frame(self, frame_no, frame):
+        """Recibe un fotograma de la previsualización de arrastre (cualquier hilo)."""
+        def show():
+            # Ignorar resultados que ya no corresponden a la última petición
+            if frame_no == self.scrub_target and not self.playing:
+                self.display_rgb(frame)
+        self.ui.post(show, key="frame")
+
+    def request_seek(self, frame):
+        """Detiene la reproducción y programa un salto; gana siempre la última petición."""
+        if self.play_token:
+            self.play_token.cancel()
+        self.seek_requested_at = time.perf_counter()
+        self.tasks.submit("seek", self.seek_video, frame)
 
-    @threaded
     def sync_video_with_start(self, event=None):
         """Sincroniza el video con la posición inicial."""
         if self.timeline_locked or not self.selected_clip:
-            print("Línea de tiempo bloqueada o ningún clip seleccionado.")
+            instrument.debug("Línea de tiempo bloqueada o ningún clip seleccionado.")
             return
 
-        print(f"Sincronizando inicio del video a {self.start_pos} segundos.")
-        self.stop_video_thread()
-        self.reopen_video(self.start_pos)
+        instrument.debug("Sincronizando inicio del video a %.3f segundos.", self.start_pos)
+        self.request_seek(self.start_frame)
 
-    @threaded
     def sync_video_with_end(self, event):
         """Sincroniza el video con la posición final."""
-        print(f"Sincronizando final del video a {self.end_pos:.2f} segundos.")
-        self.stop_video_thread()
-        self.reopen_video(int(self.end_pos * self.cap.get(cv2.CAP_PROP_FPS)))
-
-    @threaded
-    def start_video_thread(self):
-        """Inicia la reproducción del video en un hilo separado."""
-        print("Iniciando reproducción de video.")
-        self.running = True
-        self.play_video()  # Llama directamente a play_video en el hilo decorado
-
-    @threaded
-    def reopen_video(self, position):
-        """Libera el recurso actual y lo reabre en la nueva posición."""
+        instrument.debug("Sincronizando final del video a %.3f segundos.", self.end_pos)
+        self.request_seek(min(self.end_frame, self.timeline.frame_count - 1))
+
+    def seek_video(self, token, position):
+        """Posiciona la captura abierta en el fotograma indicado y reanuda la reproducción."""
+        self.playback.stop()
+        if token.cancelled:
+            return
         with self.lock:
             try:
-                if self.cap:
-                    print("Liberando recurso de video...")
-                    self.cap.release()
-                    print("Recurso de video liberado.")
-                print("Reabriendo recurso de video...")
-                self.cap = cv2.VideoCapture(self.video_path)
-                if not self.cap.isOpened():
-                    raise RuntimeError("Error: No se pudo abrir el recurso del video.")
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, position)
-                print(f"Recurso de video reabierto en posición: {position} frames.")
-                self.start_video_thread()
+                if not self.decoder or not self.decoder.is_open():
+                    raise RuntimeError("Error: El recurso del video no está abierto.")
+                with instrument.timed("seek"):
+                    # Con índice: fotograma clave anterior y decodificar hacia delante (cv2) o PTS exacto (ffmpeg)
+                    position = self.decoder.seek(position, self.seek_index)
+                instrument.debug("Video posicionado en: %d frames.", position)
             except Exception as e:
-                print(f"Error al reabrir el video: {e}")
+                instrument.error("Error al posicionar el video: %s", e)
+                return
+        if not token.cancelled:
+            self.tasks.submit("play", self.play_video)
 
-    @threaded
-    def play_video(self):
+    def play_video(self, token):
         """Reproduce el video desde la posición actual."""
-        print("Iniciando reproducción del video.")
+        instrument.debug("Iniciando reproducción del video.")
         try:
-            fps = self.cap.get(cv2.CAP_PROP_FPS)  # Obtén los FPS del video
-            if fps == 0:  # Si no se pueden obtener los FPS, usar un valor predeterminado
-                fps = 30
-
-            speed_factor = self.speed_slider.get()  # Velocidad seleccionada por el slider
-            time.sleep(1 / (fps * speed_factor))  # Ajusta el tiempo de espera
-            frames_to_skip = max(1, int(round(speed_factor)))  # Saltar frames según la velocidad
-            print(f"Velocidad: {speed_factor}, Frames a saltar: {frames_to_skip}")
-
-            with self.lock:
-                while self.running and self.cap and self.cap.isOpened():
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        print("Fin del video o error al leer fotograma.")
-                        break
-
-                    self.display_frame(frame)
-
-                    # Saltar frames para ajustar la velocidad
-                    for _ in range(frames_to_skip - 1):  # Omitir frames
-                        self.cap.grab()  # Avanzar al siguiente frame sin decodificar
-
-                    time.sleep(1 / fps)  # Tiempo entre frames basado en FPS
-            print("Finalizando reproducción del video.")
+            fps = self.media.fps  # MediaInfo ya usa 30 si la captura no da los FPS
+
+            # on_speed_change mantiene la velocidad del slider en el motor; no tocar Tk desde este hilo
+            speed_factor = self.playback.speed
+            instrument.debug("Velocidad: %s", speed_factor)
+
+            # El hilo decodificador llena el anillo; la interfaz lo consume según el reloj
+            pts_of = self.seek_index.frame_to_time if self.seek_index else None
+            self.playback.start(self.decoder, fps, speed_factor, pts_of)
+            self.play_token = token
+            self.ui.post(self.present_next_frame, token)
         except Exception as e:
-            print(f"Error durante la reproducción: {e}")
+            instrument.error("Error durante la reproducción: %s", e)
+
+    def present_next_frame(self, token):
+        """Muestra el fotograma que toca según el reloj y programa la siguiente consulta."""
+        if token.cancelled or not self.playback.active:
+            if token is self.play_token:
+                self.play_token = None
+            instrument.info("Finalizando reproducción del video. %s UI: %s", self.playback.stats(), self.ui.stats())
+            return
 
+        frame, delay = self.playback.poll()
+        if frame is not None:
+            self.display_rgb(frame)
+            self.playback.release()
+            if self.seek_requested_at is not None:
+                # Latencia de salto: desde la petición hasta el primer fotograma en pantalla
+                instrument.record("seek_latency", time.perf_counter() - self.seek_requested_at)
+                self.seek_requested_at = None
+        self.root.after(max(1, int(delay * 1000)), self.present_next_frame, token)
 
     def on_speed_change(self, value):
         """Callback para manejar cambios en el slider de velocidad."""
-        if self.running:
-            print(f"Velocidad ajustada dinámicamente a: {value}")
+        if not self.playback:
+            return  # Aún cargando los módulos
+        self.playback.set_speed(float(value))
+        if self.playing:
+            instrument.debug("Velocidad ajustada dinámicamente a: %s", value)
+
+    def show_task_debug(self, event=None):
+        """Imprime las tareas activas y en cola junto con los contadores de la interfaz."""
+        print("Tareas activas y en cola:")
+        for task in self.tasks.snapshot():
+            print(f"  #{task['id']:<5} {task['category']:<10} {task['name']:<20} {task['state']:<10} "
+                  f"edad {task['age_ms']:8.1f} ms  ejecutando {task['running_ms']:8.1f} ms")
+        print(f"UI: {self.ui.stats()}")
+        print(f"Reproducción: {self.playback.stats()}")
+        for name, stage in sorted(instrument.stage_stats().items()):
+            print(f"  {name:<12} {stage['count']:>7} llamadas  media {stage['avg_ms']:8.2f} ms  máx {stage['max_ms']:8.2f} ms")
+
+    def toggle_overlay(self, event=None):
+        """Muestra u oculta la superposición de rendimiento sobre la previsualización."""
+        self.overlay_visible = not self.overlay_visible
+        if self.overlay_visible:
+            self.overlay.place(in_=self.preview_label, x=4, y=4)
+            self.update_overlay()
+        else:
+            self.overlay.place_forget()
+            if self.overlay_job:
+                self.root.after_cancel(self.overlay_job)
+                self.overlay_job = None
+
+    def update_overlay(self):
+        """Refresca la superposición cada medio segundo mientras esté visible."""
+        if not self.overlay_visible:
+            return
+        playback = self.playback.stats()
+        stages = instrument.stage_stats()
+        seek = stages.get("seek_latency", {})
+        decode = stages.get("decode", {})
+        self.overlay.config(text=(
+            f"fps {playback['output_fps']:5.1f}  x{playback['speed']:.1f}\n"
+            f"descartados {playback['dropped']}  saltados {playback['skipped']}\n"
+            f"decodificar {decode.get('avg_ms', 0.0):6.1f} ms\n"
+            f"salto {seek.get('last_ms', 0.0):6.1f} ms (máx {seek.get('max_ms', 0.0):.1f})"
+        ))
+        self.overlay_job = self.root.after(500, self.update_overlay)
+
+    def export_clips(self):
+        """Encola la exportación de los clips definidos en `clip_data`."""
+        if not self.video_path:
+            messagebox.showerror("Error", "Carga un video antes de exportar.")
+            return
+        rangos = rangos_desde_clips(self.clip_data)
+        if not rangos:
+            messagebox.showerror("Error", "Define al menos un clip con inicio y final distintos.")
+            return
+        output_final = filedialog.asksaveasfilename(defaultextension=".mp4", filetypes=[("Video MP4", "*.mp4")])
+        if not output_final:
+            return
+        trabajo = self.export_queue.encolar(self.video_path, output_final, rangos, self.export_profile.get())
+        instrument.info("Exportación %d en cola: %d clips -> %s", trabajo.id, len(rangos), output_final)
+
+    def poll_export_progress(self):
+        """Refleja el estado de la cola de exportación en la interfaz."""
+        trabajo = self.export_queue.actual
+        pendientes = len(self.export_queue.pendientes())
+        if trabajo:
+            eta = f", quedan {format_time(trabajo.eta)}" if trabajo.eta is not None else ""
+            self.export_progress["value"] = trabajo.progreso
+            self.export_status.config(text=f"Trabajo {trabajo.id}: {trabajo.progreso:.0%}{eta} ({pendientes} en cola)")
+        elif self.export_queue.trabajos:
+            ultimo = self.export_queue.trabajos[-1]
+            self.export_progress["value"] = ultimo.progreso
+            self.export_status.config(text=f"Trabajo {ultimo.id}: {ultimo.estado}")
+        self.root.after(200, self.poll_export_progress)
 
     def create_clip_box(self, label, clip_key):
         """Crea un recuadro para cada clip."""
@@ -395,9 +777,9 @@ class ClipEditorApp:
         label_title.pack()
 
         # Campos de inicio y fin
-        label_start = tk.Label(frame, text="Inicio: 0:00", bg="white", font=("Helvetica", 10), width=15, anchor="w")
+        label_start = tk.Label(frame, text="Inicio: 0:00", bg="white", font=("Helvetica", 10), width=18, anchor="w")
         label_start.pack()
-        label_end = tk.Label(frame, text="Final: 0:00", bg="white", font=("Helvetica", 10), width=15, anchor="w")
+        label_end = tk.Label(frame, text="Final: 0:00", bg="white", font=("Helvetica", 10), width=18, anchor="w")
         label_end.pack()
 
         # Vincular el evento de selección al recuadro y sus elementos
@@ -422,7 +804,7 @@ class ClipEditorApp:
 
             # Desbloquear la línea de tiempo
             self.timeline_locked = False
-            print(f"Línea de tiempo desbloqueada para {clip_key}.")
+            instrument.debug("Línea de tiempo desbloqueada para %s.", clip_key)
 
         # Ejecutar la actualización después de un pequeño retraso
         self.root.after(50, update_selection)
@@ -430,21 +812,28 @@ class ClipEditorApp:
     def update_clip_values(self):
         """Actualiza los valores de inicio y final en el recuadro del clip seleccionado."""
         if self.selected_clip:
-            # Asegúrate de que start_pos y end_pos estén en segundos y sean enteros
-            self.clip_data[self.selected_clip]["start"] = int(self.start_pos)
-            self.clip_data[self.selected_clip]["end"] = int(self.end_pos)
+            # Guardar los segundos exactos del fotograma (sin redondear a segundos enteros)
+            self.clip_data[self.selected_clip]["start"] = self.start_pos
+            self.clip_data[self.selected_clip]["end"] = self.end_pos
 
-            # Convertir los valores a Minutos:Segundos
-            start_time = format_time(self.start_pos)
-            end_time = format_time(self.end_pos)
+            # Convertir los valores a Minutos:Segundos con centésimas
+            start_time = format_time(self.start_pos, 2)
+            end_time = format_time(self.end_pos, 2)
 
             # Actualizar las etiquetas del recuadro seleccionado
             clip_frame = self.clip_buttons[self.selected_clip]
             clip_frame.start_label.config(text=f"Inicio: {start_time}")
             clip_frame.end_label.config(text=f"Final: {end_time}")
-            print(f"Clip {self.selected_clip} actualizado: Inicio {start_time}, Final {end_time}")
 
-if __name__ == "__main__":
+def main():
     root = TkinterDnD.Tk()
-    app = ClipEditorApp(root)
-    root.mainloop()
\ No newline at end of file
+    ClipEditorApp(root)
+    root.update()  # Primera pintura antes de cargar OpenCV y el resto
+    first_paint = time.perf_counter() - STARTED
+    instrument.record("first_paint", first_paint)
+    instrument.info("Primera pintura en %.0f ms", first_paint * 1000)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,22 +1,263 @@
+import bisect
 import os
 import subprocess
-from imageio_ffmpeg import get_ffmpeg_exe
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import instrument
+from media_info import ffmpeg_exe, probe
+from seek_index import load_seek_index
 
-def generar_clips_y_unir(input_path, output_dir, output_final):
+# Rangos de tiempo por defecto para los clips (inicio, duración) en segundos
+RANGOS_POR_DEFECTO = [
+    (60, 20),   # Primer clip: desde el segundo 60 por 20 segundos
+    (120, 40),  # Segundo clip: desde el segundo 120 por 40 segundos
+    (180, 20),  # Tercer clip: desde el segundo 180 por 20 segundos
+]
+
+
+# Margen (segundos) para considerar que un corte cae sobre un fotograma clave
+TOLERANCIA_CLAVE = 0.002
+
+
+# Perfil H.264 tal como lo imprime FFmpeg -> valor de `-profile:v` de libx264
+PERFILES_H264 = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+CANALES = {"mono": 1, "stereo": 2, "5.1": 6, "5.1(side)": 6}  # Disposición de canales -> `-ac`
+
+
+# Perfiles de exportación con nombre: preset, CRF, resolución, hilos y bitrate de audio
+PERFILES = {
+    "fast-draft": {"preset": "ultrafast", "crf": "30", "escala": "854:480", "hilos": 2, "audio": "128k"},
+    "balanced": {"preset": "veryfast", "crf": "23", "escala": "1280:720", "hilos": 4, "audio": "128k"},
+    "archive": {"preset": "slow", "crf": "18", "escala": None, "hilos": 8, "audio": "192k"},
+}
+PERFIL_POR_DEFECTO = "fast-draft"
+
+
+def obtener_perfil(perfil):
+    """Devuelve la configuración de un perfil por nombre (o el propio dict si ya lo es)."""
+    if isinstance(perfil, dict):
+        return perfil
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de exportación desconocido: {perfil}")
+    return PERFILES[perfil]
+
+
+def _args_codificacion(perfil=PERFIL_POR_DEFECTO, hilos=None, **cambios):
+    """Argumentos de FFmpeg para recodificar con libx264 y AAC según un perfil."""
+    config = {**obtener_perfil(perfil), **cambios}
+    hilos = hilos or config["hilos"]
+    args = []
+    if config["escala"]:
+        args += ["-vf", f"scale={config['escala']}"]  # Reducir resolución
+    args += [
+        "-c:v", "libx264",  # Códec de video
+        "-crf", config["crf"],  # Nivel de compresión
+        "-preset", config["preset"],  # Velocidad del codificador
+    ]
+    if hilos:
+        args += ["-threads", str(hilos)]  # Limitar hilos por proceso
+    args += [
+        "-c:a", "aac",  # Códec de audio
+        "-b:a", config["audio"],  # Bitrate de audio
+    ]
+    return args
+
+
+def _args_hilos(hilos):
+    """
+    Límite de hilos de decodificación y de filtros; va antes de `-i` (el
+    `-threads` de `_args_codificacion` solo limita al codificador).
+    """
+    if not hilos:
+        return []
+    return ["-filter_threads", str(hilos), "-threads", str(hilos)]
+
+
+def _comando_corte(ffmpeg_path, input_path, inicio, duracion, salida, args, hilos=None):
+    """Comando de FFmpeg que extrae `duracion` segundos desde `inicio`."""
+    return [
+        ffmpeg_path,
+        "-y",  # Sobrescribir si el archivo existe
+        *_args_hilos(hilos),
+        "-ss", f"{inicio:.6f}",  # Búsqueda rápida para evitar acumulación de tiempos
+        "-i", input_path,  # Archivo de entrada
+        "-t", f"{duracion:.6f}",  # Duración del clip
+        *args,
+        salida,
+    ]
+
+
+def parametros_video(path):
+    """
+    Devuelve (códec, formato de píxel, resolución) del primer flujo de video,
+    leídos de la cabecera que imprime FFmpeg (una sola vez por archivo).
+    """
+    info = probe(path)
+    if not info.codec:
+        return None
+    return info.codec, info.pix_fmt, info.resolution
+
+
+def parametros_flujos(path):
+    """
+    Parámetros que deben coincidir para unir partes con copia de flujo: códec,
+    perfil, formato de píxel y resolución del video, y códec, frecuencia y
+    canales del audio. None si FFmpeg no encontró un flujo de video.
+    """
+    info = probe(path)
+    if not info.codec:
+        return None
+    return info.codec, info.profile, info.pix_fmt, info.resolution, info.audio_codec, info.sample_rate, info.channels
+
+
+def _args_como_origen(info):
+    """Argumentos para que un fragmento recodificado use el perfil, el formato de píxel y el audio del original."""
+    args = []
+    if info.pix_fmt:
+        args += ["-pix_fmt", info.pix_fmt]
+    if info.profile in PERFILES_H264:
+        args += ["-profile:v", PERFILES_H264[info.profile]]
+    if info.sample_rate:
+        args += ["-ar", str(info.sample_rate)]
+    if info.channels in CANALES:
+        args += ["-ac", str(CANALES[info.channels])]
+    return args
+
+
+def _a_mpegts(ffmpeg_path, rutas):
+    """
+    Remultiplexa las partes a MPEG-TS con los SPS/PPS dentro del flujo
+    (`h264_mp4toannexb`) y devuelve las rutas nuevas.
+
+    En MP4 las cabeceras del códec (avcC) van una sola vez al principio, así
+    que unir con copia un fragmento recodificado y uno copiado deja el resto
+    del archivo con las cabeceras del primero; en TS cada parte lleva las suyas.
+    """
+    salidas = []
+    for ruta in rutas:
+        ts = os.path.splitext(ruta)[0] + ".ts"
+        cmd = [ffmpeg_path, "-y", "-i", ruta, "-map", "0", "-c", "copy", "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", ts]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Error al remultiplexar {ruta}: {result.stderr}")
+        salidas.append(ts)
+    return salidas
+
+
+def tiene_audio(path):
+    """Indica si el archivo contiene al menos un flujo de audio."""
+    return probe(path).has_audio
+
+
+def _primer_fotograma_clave(indice, inicio, fin):
+    """Tiempo del primer fotograma clave en [inicio, fin), o None si no hay ninguno."""
+    for clave in indice.keyframes[bisect.bisect_left(indice.keyframes, indice.time_to_frame(inicio)):]:
+        tiempo = indice.frame_to_time(clave)
+        if tiempo >= fin:
+            return None
+        if tiempo >= inicio - TOLERANCIA_CLAVE:
+            return tiempo
+    return None
+
+
+def repartir_nucleos(num_trabajos, max_trabajos=None, hilos_por_trabajo=None):
+    """
+    Calcula cuántos FFmpeg ejecutar a la vez y cuántos hilos dar a cada uno
+    para no sobresuscribir los núcleos disponibles.
+
+    Retorna:
+        tuple: (max_trabajos, hilos_por_trabajo)
+    """
+    nucleos = os.cpu_count() or 1
+    if hilos_por_trabajo is not None:
+        hilos_por_trabajo = max(1, min(hilos_por_trabajo, nucleos))
+    if max_trabajos is None:
+        # Tantos trabajos como quepan con los hilos pedidos (o la mitad de los núcleos)
+        max_trabajos = max(1, nucleos // (hilos_por_trabajo or 2))
+    max_trabajos = max(1, min(max_trabajos, num_trabajos))
+    if hilos_por_trabajo is None:
+        hilos_por_trabajo = max(1, nucleos // max_trabajos)
+    return max_trabajos, hilos_por_trabajo
+
+
+class GrupoFFmpeg:
+    """Ejecuta comandos de FFmpeg en paralelo y permite cancelar los pendientes."""
+
+    def __init__(self, max_trabajos):
+        self.executor = ThreadPoolExecutor(max_workers=max_trabajos)
+        self.cancelado = threading.Event()
+        self.procesos = set()
+        self.lock = threading.Lock()
+
+    def ejecutar(self, cmd):
+        """Ejecuta un comando; devuelve (código de salida, stderr)."""
+        if self.cancelado.is_set():
+            return None, "Cancelado"
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        with self.lock:
+            self.procesos.add(proceso)
+            if self.cancelado.is_set():
+                proceso.terminate()  # cancelar() llegó entre la comprobación y el registro
+        try:
+            _, stderr = proceso.communicate()
+        finally:
+            with self.lock:
+                self.procesos.discard(proceso)
+            instrument.record("ffmpeg", time.perf_counter() - inicio)
+        if self.cancelado.is_set():
+            return None, "Cancelado"
+        return proceso.returncode, stderr
+
+    def cancelar(self):
+        """Cancela los trabajos en cola y termina los procesos en ejecución."""
+        self.cancelado.set()
+        with self.lock:
+            for proceso in self.procesos:
+                proceso.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def generar_clips_y_unir(input_path, output_dir, output_final, rangos=None, max_trabajos=None, hilos_por_trabajo=None,
+                         modo="recodificar", perfil=PERFIL_POR_DEFECTO):
     """
     Genera clips comprimidos directamente con FFmpeg y los une en un único archivo.
 
+    Los clips se codifican en paralelo; si uno falla se cancelan los demás. En
+    modo "inteligente" se conserva la resolución original y solo se recodifica
+    el fragmento anterior al primer fotograma clave de cada clip; el resto se
+    copia sin recodificar.
+
     Parámetros:
         input_path (str): Ruta del archivo de video original.
         output_dir (str): Carpeta donde se guardarán los clips.
         output_final (str): Ruta del archivo de video final unificado.
+        rangos (list): Lista de (inicio, duración) en segundos de cada clip.
+        max_trabajos (int): Máximo de FFmpeg simultáneos (por defecto la mitad de los núcleos).
+        hilos_por_trabajo (int): Hilos asignados a cada FFmpeg (por defecto núcleos / trabajos).
+        modo (str): "recodificar" (por defecto) o "inteligente" (copia de flujo).
+        perfil (str): Perfil de codificación de `PERFILES` usado al recodificar.
 
     Retorna:
-        None
+        dict: Estado por clip ({"estado", "segundos", "error"}), o None si falló.
     """
     try:
         # Obtener la ruta de FFmpeg
-        ffmpeg_path = get_ffmpeg_exe()
+        ffmpeg_path = ffmpeg_exe()
 
         # Validar la existencia del archivo de entrada
         if not os.path.isfile(input_path):
@@ -30,40 +271,105 @@ def generar_clips_y_unir(input_path, output_dir, output_final):
         output_dir = os.path.normpath(output_dir)
         output_final = os.path.normpath(output_final)
 
-        # Definir los rangos de tiempo para los clips (en segundos)
-        rangos = [
-            (60, 20),   # Primer clip: desde el segundo 60 por 20 segundos
-            (120, 40),  # Segundo clip: desde el segundo 120 por 40 segundos
-            (180, 20),  # Tercer clip: desde el segundo 180 por 20 segundos
-        ]
+        if rangos is None:
+            rangos = RANGOS_POR_DEFECTO
+        if modo not in ("recodificar", "inteligente"):
+            raise ValueError(f"Modo de exportación desconocido: {modo}")
+        config = obtener_perfil(perfil)
+        max_trabajos, hilos_por_trabajo = repartir_nucleos(len(rangos), max_trabajos, hilos_por_trabajo or config["hilos"])
+
+        if modo == "inteligente":
+            indice = load_seek_index(input_path)
+            origen = probe(input_path)
+            # Solo se puede copiar si los fragmentos recodificados (H.264 + AAC) pueden igualar al original
+            copia_posible = origen.codec == "h264" and origen.audio_codec in (None, "aac")
+            args_origen = _args_codificacion(config, hilos_por_trabajo, escala=None, crf="18") + _args_como_origen(origen)
 
-        # Generar cada clip directamente con FFmpeg
-        clips_paths = []
+        # Preparar las partes de cada clip: (número de clip, ruta de la parte, comando)
+        partes = []
         for i, (inicio, duracion) in enumerate(rangos):
             output_clip_path = os.path.join(output_dir, f"clip_{i+1}.mp4")
             output_clip_path = os.path.normpath(output_clip_path)  # Normalizar ruta
-            clips_paths.append(output_clip_path)
-            cmd = [
-                ffmpeg_path,
-                "-y",  # Sobrescribir si el archivo existe
-                "-ss", str(inicio),  # Búsqueda rápida para evitar acumulación de tiempos
-                "-i", input_path,  # Archivo de entrada
-                "-t", str(duracion),  # Duración del clip
-                "-vf", "scale=854:480",  # Reducir a 480p
-                "-c:v", "libx264",  # Códec de video
-                "-crf", "30",  # Nivel de compresión
-                "-preset", "ultrafast",  # Mayor compresión
-                "-c:a", "aac",  # Códec de audio
-                "-b:a", "128k",  # Bitrate de audio
-                output_clip_path,
-            ]
-            print(f"Generando clip {i+1}: {output_clip_path}")
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-            # Verificar si FFmpeg falló
-            if result.returncode != 0:
-                print(f"Error en FFmpeg: {result.stderr}")
-                raise RuntimeError(f"Error al generar el clip {i+1}: {result.stderr}")
+            if modo == "recodificar":
+                cmd = _comando_corte(ffmpeg_path, input_path, inicio, duracion, output_clip_path,
+                                     _args_codificacion(config, hilos_por_trabajo), hilos_por_trabajo)
+                partes.append((i + 1, output_clip_path, cmd))
+                continue
+
+            clave = _primer_fotograma_clave(indice, inicio, inicio + duracion)
+            if clave is None or not copia_posible:
+                # Sin fotograma clave dentro del rango: recodificar el clip completo
+                cmd = _comando_corte(ffmpeg_path, input_path, inicio, duracion, output_clip_path, args_origen,
+                                     hilos_por_trabajo)
+                partes.append((i + 1, output_clip_path, cmd))
+                continue
+
+            if clave - inicio > TOLERANCIA_CLAVE:
+                # Recodificar solo el fragmento de GOP anterior al primer fotograma clave
+                cabeza = os.path.join(output_dir, f"clip_{i+1}_cabeza.mp4")
+                cmd = _comando_corte(ffmpeg_path, input_path, inicio, clave - inicio, cabeza, args_origen,
+                                     hilos_por_trabajo)
+                partes.append((i + 1, cabeza, cmd))
+            cuerpo = os.path.join(output_dir, f"clip_{i+1}_copia.mp4")
+            cmd = _comando_corte(ffmpeg_path, input_path, clave + TOLERANCIA_CLAVE / 2, inicio + duracion - clave, cuerpo,
+                                 ["-c", "copy", "-avoid_negative_ts", "make_zero"])
+            partes.append((i + 1, cuerpo, cmd))
+
+        # Generar las partes en paralelo
+        instrument.info("Generando %d partes de %d clips con %d trabajos de %d hilos.", len(partes), len(rangos), max_trabajos, hilos_por_trabajo)
+        progreso = {i + 1: {"estado": "pendiente", "segundos": 0.0, "error": None} for i in range(len(rangos))}
+        restantes = {n: sum(1 for p in partes if p[0] == n) for n in progreso}
+        fallo = None
+        with GrupoFFmpeg(max_trabajos) as grupo:
+            def generar_parte(n, cmd):
+                progreso[n]["estado"] = "generando"
+                inicio = time.perf_counter()
+                codigo, stderr = grupo.ejecutar(cmd)
+                progreso[n]["segundos"] += time.perf_counter() - inicio
+                return codigo, stderr
+
+            futuros = {grupo.executor.submit(generar_parte, n, cmd): (n, ruta) for n, ruta, cmd in partes}
+            for futuro in as_completed(futuros):
+                n, ruta = futuros[futuro]
+                codigo, stderr = futuro.result()
+                if codigo == 0:
+                    restantes[n] -= 1
+                    if restantes[n] == 0:
+                        progreso[n]["estado"] = "ok"
+                        instrument.info("Clip %d generado (%.1f s)", n, progreso[n]["segundos"])
+                elif codigo is None:
+                    progreso[n]["estado"] = "cancelado"
+                else:
+                    progreso[n]["estado"] = "error"
+                    progreso[n]["error"] = stderr
+                    if fallo is None:
+                        # Verificar si FFmpeg falló y cancelar el resto
+                        instrument.error("Error en FFmpeg: %s", stderr)
+                        fallo = n
+                        grupo.cancelar()
+
+        if fallo is not None:
+            for estado in progreso.values():
+                if estado["estado"] in ("pendiente", "generando"):
+                    estado["estado"] = "cancelado"
+            for n, estado in progreso.items():
+                instrument.info("Clip %d: %s", n, estado["estado"])
+            raise RuntimeError(f"Error al generar el clip {fallo}: {progreso[fallo]['error']}")
+
+        # Unir los clips en un único archivo; copiar el flujo si todos los parámetros coinciden
+        clips_paths = [ruta for _, ruta, _ in partes]
+        parametros = {parametros_flujos(ruta) for ruta in clips_paths}
+        if len(parametros) == 1 and None not in parametros:
+            args_union = ["-c", "copy"]
+            if modo == "inteligente":
+                # Fragmentos recodificados y copiados: unir en TS con las cabeceras de cada parte
+                clips_paths = _a_mpegts(ffmpeg_path, clips_paths)
+                if origen.audio_codec:
+                    args_union += ["-bsf:a", "aac_adtstoasc"]
+        elif modo == "inteligente":
+            args_union = _args_codificacion(config, escala=None, crf="18")  # Conservar la resolución original
+        else:
+            args_union = _args_codificacion(config)
 
         # Crear un archivo de lista para FFmpeg
         concat_list_path = os.path.join(output_dir, "concat_list.txt")
@@ -72,39 +378,276 @@ def generar_clips_y_unir(input_path, output_dir, output_final):
             for clip_path in clips_paths:
                 f.write(f"file '{clip_path.replace(os.sep, '/')}'\n")
 
-        # Unir los clips en un único archivo
         cmd_concat = [
             ffmpeg_path,
             "-y",
             "-f", "concat",
             "-safe", "0",
             "-i", concat_list_path,
-            "-c:v", "libx264",
-            "-crf", "30",
-            "-preset", "ultrafast",
-            "-c:a", "aac",
-            "-b:a", "128k",
+            *args_union,
             output_final,
         ]
-        print(f"Uniendo clips en: {output_final}")
+        instrument.info("Uniendo clips en: %s (%s)", output_final, "copia de flujo" if args_union[1] == "copy" else "recodificando")
         result = subprocess.run(cmd_concat, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
         # Verificar si FFmpeg falló en la concatenación
         if result.returncode != 0:
-            print(f"Error en FFmpeg durante la concatenación: {result.stderr}")
+            instrument.error("Error en FFmpeg durante la concatenación: %s", result.stderr)
             raise RuntimeError(f"Error al unir los clips: {result.stderr}")
 
-        print(f"Archivo unificado generado correctamente: {output_final}")
+        instrument.info("Archivo unificado generado correctamente: %s", output_final)
+        return progreso
+
+    except Exception as e:
+        instrument.error("Error al generar los clips y unirlos: %s", e)
+        return None
+
+def grafo_filtro_complejo(num_clips, audio=True, escala=None):
+    """
+    Construye el `filter_complex` que concatena `num_clips` entradas ya
+    recortadas y escala el resultado una sola vez.
+    """
+    entradas = "".join(f"[{i}:v:0]" + (f"[{i}:a:0]" if audio else "") for i in range(num_clips))
+    grafo = f"{entradas}concat=n={num_clips}:v=1:a={1 if audio else 0}[vc]" + ("[a]" if audio else "")
+    return grafo + (f";[vc]scale={escala}[v]" if escala else ";[vc]null[v]")
+
+
+def comando_filtro_complejo(ffmpeg_path, input_path, output_final, rangos, audio=True, perfil=PERFIL_POR_DEFECTO,
+                            hilos=None):
+    """
+    Comando de FFmpeg para exportar `rangos` en una sola pasada.
+
+    `hilos` (por defecto el del perfil) limita también la decodificación de
+    cada entrada y los filtros, no solo el codificador.
+    """
+    config = obtener_perfil(perfil)
+    hilos = hilos or config["hilos"]
+    cmd = [ffmpeg_path, "-y"]
+    for inicio, duracion in rangos:
+        # -threads es una opción de cada entrada, así que se repite antes de cada -i
+        cmd += [*_args_hilos(hilos), "-ss", f"{inicio:.6f}", "-t", f"{duracion:.6f}", "-i", input_path]
+    cmd += [
+        "-filter_complex", grafo_filtro_complejo(len(rangos), audio, config["escala"]),
+        "-map", "[v]",
+        *(["-map", "[a]"] if audio else []),
+        *_args_codificacion(config, hilos, escala=None),  # La escala ya está en el grafo
+        output_final,
+    ]
+    return cmd
+
+
+def exportar_filtro_complejo(input_path, output_final, rangos=None, perfil=PERFIL_POR_DEFECTO, hilos=None,
+                             lanzar=False):
+    """
+    Exporta los clips en una única pasada de decodificación/codificación con
+    un grafo `filter_complex`, sin archivos intermedios.
+
+    Cada rango se abre como una entrada propia con búsqueda rápida (-ss/-t), de
+    modo que solo se decodifican los fragmentos necesarios.
+
+    Parámetros:
+        input_path (str): Ruta del archivo de video original.
+        output_final (str): Ruta del archivo de video final.
+        rangos (list): Lista de (inicio, duración) en segundos de cada clip.
+        perfil (str): Perfil de codificación de `PERFILES`.
+        hilos (int): Hilos de FFmpeg (por defecto los del perfil).
+        lanzar (bool): Propagar la excepción (con el error de FFmpeg) en vez de
+            devolver False.
+
+    Retorna:
+        bool: True si la exportación terminó correctamente.
+    """
+    try:
+        ffmpeg_path = ffmpeg_exe()
+
+        # Validar la existencia del archivo de entrada
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"El archivo de entrada no existe: {input_path}")
+
+        input_path = os.path.normpath(input_path)
+        output_final = os.path.normpath(output_final)
+        os.makedirs(os.path.dirname(output_final) or ".", exist_ok=True)
+        if rangos is None:
+            rangos = RANGOS_POR_DEFECTO
+
+        cmd = comando_filtro_complejo(ffmpeg_path, input_path, output_final, rangos, tiene_audio(input_path), perfil,
+                                      hilos)
+        instrument.info("Exportando %d clips en una sola pasada: %s", len(rangos), output_final)
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            instrument.error("Error en FFmpeg: %s", result.stderr)
+            raise RuntimeError(f"Error al exportar los clips: {result.stderr}")
+
+        instrument.info("Archivo generado correctamente: %s", output_final)
+        return True
+
+    except Exception as e:
+        instrument.error("Error al exportar los clips: %s", e)
+        if lanzar:
+            raise
+        return False
+
+# Hueco máximo (segundos) entre dos cortes de un archivo para reutilizar su
+# entrada decodificando de corrido; con más distancia es más barato abrirla de nuevo con -ss
+HUECO_MAX_ENTRADA = 30.0
+
+
+def entradas_multiorigen(cortes, hueco_max=HUECO_MAX_ENTRADA):
+    """
+    Agrupa los cortes en entradas de FFmpeg: cada archivo se abre una sola vez
+    por tramo que avanza hacia delante, en vez de una entrada por corte.
+
+    Un corte reutiliza la última entrada de su archivo si empieza después de
+    donde acabó el anterior y a menos de `hueco_max` segundos; si va hacia
+    atrás o está lejos se abre otra entrada, para que FFmpeg no tenga que
+    retener fotogramas ni decodificar tramos largos que no se usan.
+
+    Retorna:
+        tuple: (entradas, tramos) con `entradas` = [(archivo, inicio)] para
+        `-ss inicio -i archivo` y `tramos` = [(entrada, inicio, fin)] de cada
+        corte en orden, con tiempos relativos al inicio de su entrada.
+    """
+    entradas = []
+    tramos = []
+    abiertas = {}  # archivo -> (índice de la entrada, fin del último corte)
+    for archivo, inicio, duracion in cortes:
+        fin = inicio + duracion
+        actual = abiertas.get(archivo)
+        if actual is None or not actual[1] <= inicio <= actual[1] + hueco_max:
+            entradas.append((archivo, inicio))
+            actual = (len(entradas) - 1, fin)
+        indice = actual[0]
+        abiertas[archivo] = (indice, fin)
+        base = entradas[indice][1]
+        tramos.append((indice, inicio - base, fin - base))
+    return entradas, tramos
+
+
+def grafo_multiorigen(tramos, num_entradas, audio=True, escala="854:480"):
+    """
+    Grafo `filter_complex` para concatenar cortes de archivos distintos.
+
+    Cada entrada se reparte (split/asplit) entre sus cortes, que se recortan
+    con trim/atrim, se escalan a la misma resolución y se concatenan.
+    """
+    usos = [[i for i, (entrada, _, _) in enumerate(tramos) if entrada == k] for k in range(num_entradas)]
+    partes = []
+    video = {}  # corte -> etiqueta de su rama de video sin recortar
+    sonido = {}
+    for k, cortes in enumerate(usos):
+        if len(cortes) == 1:
+            video[cortes[0]] = f"{k}:v:0"
+            sonido[cortes[0]] = f"{k}:a:0"
+            continue
+        partes.append(f"[{k}:v:0]split={len(cortes)}" + "".join(f"[e{i}v]" for i in cortes))
+        if audio:
+            partes.append(f"[{k}:a:0]asplit={len(cortes)}" + "".join(f"[e{i}a]" for i in cortes))
+        for i in cortes:
+            video[i] = f"e{i}v"
+            sonido[i] = f"e{i}a"
+
+    entradas = ""
+    for i, (_, inicio, fin) in enumerate(tramos):
+        partes.append(f"[{video[i]}]trim=start={inicio:.6f}:end={fin:.6f},setpts=PTS-STARTPTS,"
+                      f"scale={escala}:force_original_aspect_ratio=decrease,"
+                      f"pad={escala}:(ow-iw)/2:(oh-ih)/2,setsar=1[v{i}]")
+        if audio:
+            partes.append(f"[{sonido[i]}]atrim=start={inicio:.6f}:end={fin:.6f},asetpts=PTS-STARTPTS[a{i}]")
+        entradas += f"[v{i}]" + (f"[a{i}]" if audio else "")
+    partes.append(f"{entradas}concat=n={len(tramos)}:v=1:a={1 if audio else 0}[v]" + ("[a]" if audio else ""))
+    return ";\n".join(partes)
+
+
+def exportar_proyecto(proyecto, output_final, perfil=PERFIL_POR_DEFECTO):
+    """
+    Exporta un proyecto de varios archivos en una sola pasada de FFmpeg.
+
+    Cada archivo se abre una vez por tramo consecutivo de cortes (ver
+    `entradas_multiorigen`) y los cortes se recortan dentro del grafo, así
+    que el número de demultiplexores y decodificadores no crece con el de
+    segmentos. El grafo se pasa en un archivo (`-filter_complex_script`)
+    para no superar el límite de longitud de la línea de comandos.
+
+    Parámetros:
+        proyecto: Objeto con un método `cortes()` que devuelve una lista de
+            (archivo, inicio, duración) en segundos (por ejemplo `project.Project`).
+        output_final (str): Ruta del archivo de video final.
+        perfil (str): Perfil de codificación de `PERFILES`.
+
+    Retorna:
+        bool: True si la exportación terminó correctamente.
+    """
+    grafo_path = None
+    try:
+        ffmpeg_path = ffmpeg_exe()
+        cortes = proyecto.cortes()
+        if not cortes:
+            raise ValueError("El proyecto no tiene segmentos.")
+
+        archivos = {archivo for archivo, _, _ in cortes}
+        for archivo in archivos:
+            if not os.path.isfile(archivo):
+                raise FileNotFoundError(f"El archivo de entrada no existe: {archivo}")
+
+        config = obtener_perfil(perfil)
+        escala = config["escala"]
+        if not escala:
+            # Sin escala en el perfil: usar la resolución del primer archivo
+            parametros = parametros_video(cortes[0][0])
+            if parametros is None:
+                raise RuntimeError(f"No se pudo leer el video: {cortes[0][0]}")
+            escala = parametros[2].replace("x", ":")
+        audio = all(tiene_audio(archivo) for archivo in archivos)
+        if not audio:
+            instrument.warning("Algún archivo no tiene audio; se exportará sin audio.")
+
+        output_final = os.path.normpath(output_final)
+        os.makedirs(os.path.dirname(output_final) or ".", exist_ok=True)
+        entradas, tramos = entradas_multiorigen(cortes)
+        grafo_path = output_final + ".grafo.txt"
+        with open(grafo_path, "w", encoding="utf-8") as f:
+            f.write(grafo_multiorigen(tramos, len(entradas), audio, escala))
+
+        cmd = [ffmpeg_path, "-y"]
+        for archivo, inicio in entradas:
+            cmd += ["-ss", f"{inicio:.6f}", "-i", os.path.normpath(archivo)]
+        cmd += [
+            "-filter_complex_script", grafo_path,
+            "-map", "[v]",
+            *(["-map", "[a]"] if audio else []),
+            *_args_codificacion(config, escala=None),  # La escala ya está en el grafo
+            output_final,
+        ]
+        instrument.info("Exportando proyecto (%d segmentos de %d archivos en %d entradas): %s",
+                        len(cortes), len(archivos), len(entradas), output_final)
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            instrument.error("Error en FFmpeg: %s", result.stderr)
+            raise RuntimeError(f"Error al exportar el proyecto: {result.stderr}")
+
+        instrument.info("Archivo generado correctamente: %s", output_final)
+        return True
 
     except Exception as e:
-        print(f"Error al generar los clips y unirlos: {e}")
+        instrument.error("Error al exportar el proyecto: %s", e)
+        return False
+    finally:
+        if grafo_path and os.path.exists(grafo_path):
+            os.remove(grafo_path)
 
 if __name__ == "__main__":
-    # Parámetros de entrada
-    input_video_path = r"C:/data/video.mp4"  # Ruta del video original
-    output_dir = r"C:/data/clips"  # Carpeta donde se guardarán los clips
-    output_final_path = r"C:/data/final/final_video.mp4"  # Ruta del video unificado
+    import argparse
 
-    # Generar los clips y unirlos
-    generar_clips_y_unir(input_path=input_video_path, output_dir=output_dir, output_final=output_final_path)
+    # Para procesar muchos archivos sin interfaz usar batch.py
+    parser = argparse.ArgumentParser(description="Genera los clips de un video y los une.")
+    parser.add_argument("input", help="Ruta del video original.")
+    parser.add_argument("output", help="Ruta del video unificado.")
+    parser.add_argument("--clips-dir", default=None, help="Carpeta de los clips intermedios.")
+    parser.add_argument("--modo", choices=["recodificar", "inteligente"], default="recodificar")
+    parser.add_argument("--perfil", choices=list(PERFILES), default=PERFIL_POR_DEFECTO)
+    args = parser.parse_args()
 
+    output_dir = args.clips_dir or os.path.join(os.path.dirname(os.path.abspath(args.output)), "clips")
+    progreso = generar_clips_y_unir(input_path=args.input, output_dir=output_dir, output_final=args.output,
+                                    modo=args.modo, perfil=args.perfil)
+    raise SystemExit(0 if progreso is not None else 1)
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backup import exportar_filtro_complejo, obtener_perfil, repartir_nucleos, PERFILES, PERFIL_POR_DEFECTO
+
+
+def leer_manifiesto(ruta):
+    """
+    Lee un manifiesto CSV (columnas file,start,duration) o JSON (lista de
+    objetos con esas claves) y agrupa los rangos por archivo.
+
+    Retorna:
+        dict: {archivo: [(inicio, duración), ...]} en el orden del manifiesto.
+    """
+    if ruta.lower().endswith(".json"):
+        with open(ruta, "r", encoding="utf-8") as f:
+            filas = json.load(f)
+    else:
+        with open(ruta, "r", encoding="utf-8", newline="") as f:
+            filas = list(csv.DictReader(f))
+
+    trabajos = {}
+    for fila in filas:
+        archivo = os.path.abspath(fila["file"])
+        trabajos.setdefault(archivo, []).append((float(fila["start"]), float(fila["duration"])))
+    return trabajos
+
+
+def trabajos_desde_glob(patron, inicio, duracion):
+    """Un trabajo con el mismo rango por cada archivo que coincide con `patron`."""
+    return {os.path.abspath(a): [(inicio, duracion)] for a in sorted(glob.glob(patron, recursive=True))
+            if os.path.isfile(a)}
+
+
+def ruta_salida(output_dir, archivo):
+    """Nombre de salida único por archivo de entrada (nombre + hash corto de la ruta)."""
+    nombre = os.path.splitext(os.path.basename(archivo))[0]
+    sufijo = hashlib.sha1(archivo.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(output_dir, f"{nombre}_{sufijo}.mp4")
+
+
+class Checkpoint:
+    """Registro JSONL de trabajos terminados que permite reanudar un lote."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.lock = threading.Lock()
+        self.hechos = set()
+        if os.path.isfile(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        entrada = json.loads(linea)
+                    except ValueError:
+                        continue  # Línea truncada por una interrupción
+                    if entrada.get("estado") == "ok":
+                        self.hechos.add(entrada["output"])
+
+    def terminado(self, output):
+        return output in self.hechos and os.path.isfile(output)
+
+    def registrar(self, entrada):
+        with self.lock:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada) + "\n")
+            if entrada["estado"] == "ok":
+                self.hechos.add(entrada["output"])
+
+
+def ejecutar_lote(trabajos, output_dir, max_trabajos=None, perfil=PERFIL_POR_DEFECTO, checkpoint=None, reporte=None):
+    """
+    Exporta cada archivo de `trabajos` con un grupo acotado de hilos, saltando
+    las salidas ya terminadas según el checkpoint.
+
+    Retorna:
+        list: Una entrada por trabajo con input, output, estado, segundos, bytes
+        y el error de FFmpeg si falló.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(checkpoint or os.path.join(output_dir, ".checkpoint.jsonl"))
+    pendientes = []
+    resultados = []
+    for archivo, rangos in trabajos.items():
+        output = ruta_salida(output_dir, archivo)
+        if checkpoint.terminado(output):
+            resultados.append({"input": archivo, "output": output, "estado": "omitido", "segundos": 0.0,
+                               "bytes": os.path.getsize(output), "error": ""})
+        else:
+            pendientes.append((archivo, rangos, output))
+    max_trabajos, hilos = repartir_nucleos(max(1, len(pendientes)), max_trabajos)
+    config = obtener_perfil(perfil)
+    print(f"{len(trabajos)} trabajos: {len(resultados)} ya terminados, {len(pendientes)} pendientes "
+          f"con {max_trabajos} trabajos de {hilos} hilos.")
+
+    def exportar(archivo, rangos, output):
+        inicio = time.perf_counter()
+        try:
+            exportar_filtro_complejo(archivo, output, rangos, config, hilos, lanzar=True)
+            error = ""
+        except Exception as e:
+            error = str(e)  # Incluye la salida de error de FFmpeg
+        return {
+            "input": archivo,
+            "output": output,
+            "estado": "error" if error else "ok",
+            "segundos": time.perf_counter() - inicio,
+            "bytes": os.path.getsize(output) if not error and os.path.isfile(output) else 0,
+            "error": error,
+        }
+
+    with ThreadPoolExecutor(max_workers=max_trabajos) as pool:
+        futuros = [pool.submit(exportar, *p) for p in pendientes]
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            resultado = futuro.result()
+            checkpoint.registrar(resultado)
+            resultados.append(resultado)
+            print(f"[{n}/{len(pendientes)}] {resultado['estado']:6s} {resultado['segundos']:8.1f} s  {resultado['input']}")
+
+    if reporte:
+        with open(reporte, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["input", "output", "estado", "segundos", "bytes", "error"])
+            writer.writeheader()
+            writer.writerows(resultados)
+        print(f"Reporte de tiempos escrito en: {reporte}")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extracción de clips por lotes sin interfaz gráfica.")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--manifest", help="CSV o JSON con columnas file, start, duration.")
+    origen.add_argument("--glob", help="Patrón de archivos (admite **), p. ej. 'ingesta/**/*.mp4'.")
+    parser.add_argument("--start", type=float, default=0.0, help="Inicio del clip con --glob (segundos).")
+    parser.add_argument("--duration", type=float, default=60.0, help="Duración del clip con --glob (segundos).")
+    parser.add_argument("--output-dir", required=True, help="Carpeta de salida.")
+    parser.add_argument("--workers", type=int, default=None, help="FFmpeg simultáneos.")
+    parser.add_argument("--perfil", choices=list(PERFILES), default=PERFIL_POR_DEFECTO)
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto en la carpeta de salida).")
+    parser.add_argument("--report", help="CSV con el tiempo de cada trabajo.")
+    args = parser.parse_args()
+
+    if args.manifest:
+        trabajos = leer_manifiesto(args.manifest)
+    else:
+        trabajos = trabajos_desde_glob(args.glob, args.start, args.duration)
+
+    resultados = ejecutar_lote(trabajos, args.output_dir, args.workers, args.perfil, args.checkpoint, args.report)
+    errores = sum(1 for r in resultados if r["estado"] == "error")
+    raise SystemExit(1 if errores else 0)
@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource  # Solo disponible en sistemas POSIX
+except ImportError:
+    resource = None
+
+import cv2
+import numpy as np
+
+from media_info import ffmpeg_exe, probe
+from backup import generar_clips_y_unir, exportar_filtro_complejo, RANGOS_POR_DEFECTO, PERFILES
+from playback import PlaybackEngine, PREVIEW_SIZE
+from decoder import DECODERS, open_decoder
+from seek_index import build_seek_index
+
+# Rangos usados sobre los videos sintéticos (caben en SINTETICO_DURACION)
+RANGOS_SINTETICOS = [(5, 10), (20, 10), (40, 10)]
+SINTETICO_DURACION = 60
+SUITE_TAMANOS = ("1280x720", "1920x1080")  # Resoluciones de los videos de la batería
+SUITE_SEMILLA = 1234  # Semilla fija para que los saltos sean los mismos en cada ejecución
+
+
+def generar_video_sintetico(ruta, duracion=SINTETICO_DURACION, tamano="1920x1080", fps=30):
+    """Genera localmente con FFmpeg un video de prueba (testsrc2 + tono) reproducible."""
+    cmd = [
+        ffmpeg_exe(),
+        "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={tamano}:rate={fps}:duration={duracion}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duracion}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(fps * 2),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest",
+        ruta,
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Error al generar el video sintético: {result.stderr}")
+    return ruta
+
+
+def tiempo_cpu_hijos():
+    """Tiempo de CPU (usuario + sistema) consumido por los procesos hijos terminados."""
+    if resource is None:
+        return 0.0
+    uso = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return uso.ru_utime + uso.ru_stime
+
+
+def memoria_rss(pid="self"):
+    """Memoria residente del proceso en MB (0 si el sistema no expone /proc)."""
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0.0
+    return paginas * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def bytes_escritos(*rutas):
+    """Suma el tamaño de los archivos indicados (y de los contenidos en carpetas)."""
+    total = 0
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for carpeta, _, archivos in os.walk(ruta):
+                total += sum(os.path.getsize(os.path.join(carpeta, a)) for a in archivos)
+        elif os.path.isfile(ruta):
+            total += os.path.getsize(ruta)
+    return total
+
+
+def comparar_exportaciones(input_path, rangos=None):
+    """
+    Ejecuta la exportación por clips + concat y la de una sola pasada sobre el
+    mismo video y devuelve el tiempo de pared y los bytes escritos de cada una
+    (`ok` es False si la exportación falló y sus tiempos no son válidos).
+    """
+    rangos = rangos or RANGOS_POR_DEFECTO
+    resultados = {}
+    carpeta = tempfile.mkdtemp(prefix="app-super-bench-")
+    try:
+        clips_dir = os.path.join(carpeta, "clips")
+        final = os.path.join(carpeta, "final_clips.mp4")
+        inicio = time.perf_counter()
+        ok = generar_clips_y_unir(input_path, clips_dir, final, rangos=rangos) is not None
+        resultados["clips_y_concat"] = {
+            "ok": ok,
+            "segundos": time.perf_counter() - inicio,
+            "bytes": bytes_escritos(clips_dir, final),
+        }
+
+        final = os.path.join(carpeta, "final_filtro.mp4")
+        inicio = time.perf_counter()
+        ok = exportar_filtro_complejo(input_path, final, rangos=rangos)
+        resultados["filtro_complejo"] = {
+            "ok": ok,
+            "segundos": time.perf_counter() - inicio,
+            "bytes": bytes_escritos(final),
+        }
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return resultados
+
+
+def comparar_perfiles(input_path=None, rangos=None, fps=None, perfiles=None):
+    """
+    Ejecuta `generar_clips_y_unir` con cada perfil y mide fps de codificación,
+    tamaño de salida y tiempo de CPU de FFmpeg.
+
+    Si no se indica `input_path` se genera un video sintético de 1080p. Los
+    fps del video se leen de su cabecera salvo que se indiquen. Los perfiles
+    cuya exportación falla se marcan con `ok` False y sin tiempos.
+    """
+    rangos = rangos or (RANGOS_SINTETICOS if input_path is None else RANGOS_POR_DEFECTO)
+    resultados = {}
+    carpeta = tempfile.mkdtemp(prefix="app-super-bench-")
+    try:
+        if input_path is None:
+            input_path = generar_video_sintetico(os.path.join(carpeta, "sintetico.mp4"), fps=fps or 30)
+        fotogramas = sum(duracion for _, duracion in rangos) * (fps or probe(input_path).fps)
+
+        for nombre in perfiles or PERFILES:
+            final = os.path.join(carpeta, f"final_{nombre}.mp4")
+            cpu = tiempo_cpu_hijos()
+            inicio = time.perf_counter()
+            progreso = generar_clips_y_unir(input_path, os.path.join(carpeta, f"clips_{nombre}"), final,
+                                            rangos=rangos, perfil=nombre)
+            segundos = time.perf_counter() - inicio
+            if progreso is None:
+                resultados[nombre] = {"ok": False}
+                continue
+            resultados[nombre] = {
+                "ok": True,
+                "segundos": segundos,
+                "fps": fotogramas / segundos if segundos else 0.0,
+                "bytes": bytes_escritos(final),
+                "cpu": tiempo_cpu_hijos() - cpu,
+            }
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return resultados
+
+
+def medir_saltos(input_path, saltos=50, semilla=SUITE_SEMILLA, decodificador="cv2", size=PREVIEW_SIZE):
+    """Latencia de salto aleatorio (posicionar con el índice y decodificar un fotograma)."""
+    indice = build_seek_index(input_path)
+    rng = random.Random(semilla)
+    dec = open_decoder(input_path, size, decodificador)
+    width, height = size
+    dst = np.empty((height, width, 3), dtype=np.uint8)
+    tiempos = []
+    try:
+        for _ in range(saltos):
+            fotograma = rng.randrange(len(indice))
+            inicio = time.perf_counter()
+            dec.seek(fotograma, indice)
+            dec.read_into(dst)
+            tiempos.append(time.perf_counter() - inicio)
+    finally:
+        dec.release()
+    tiempos = np.array(tiempos) * 1000
+    return {"media_ms": float(tiempos.mean()), "p95_ms": float(np.percentile(tiempos, 95)), "max_ms": float(tiempos.max())}
+
+
+def medir_arrastre(input_path, pasos=100, paso_max=10, semilla=SUITE_SEMILLA, decodificador="cv2", size=PREVIEW_SIZE):
+    """
+    Latencia de la previsualización al arrastrar un manejador: desde un punto
+    aleatorio, saltos cortos hacia delante y hacia atrás (hasta `paso_max`
+    fotogramas) decodificados como en `ScrubPreview`, sin caché.
+    """
+    indice = build_seek_index(input_path)
+    rng = random.Random(semilla)
+    dec = open_decoder(input_path, size, decodificador)
+    width, height = size
+    tiempos = []
+    try:
+        fotograma = rng.randrange(len(indice))
+        for _ in range(pasos):
+            fotograma = min(max(0, fotograma + rng.randint(-paso_max, paso_max)), len(indice) - 1)
+            inicio = time.perf_counter()
+            dec.seek(fotograma, indice)
+            dec.read_into(np.empty((height, width, 3), dtype=np.uint8))
+            tiempos.append(time.perf_counter() - inicio)
+    finally:
+        dec.release()
+    tiempos = np.array(tiempos) * 1000
+    return {"media_ms": float(tiempos.mean()), "p95_ms": float(np.percentile(tiempos, 95)), "max_ms": float(tiempos.max())}
+
+
+def medir_decodificacion(input_path, fotogramas=300, size=PREVIEW_SIZE, decodificador="cv2"):
+    """
+    Fotogramas por segundo de decodificar y preparar para la previsualización,
+    sin reloj, y memoria usada por el decodificador.
+
+    `pico_python_mb` es el pico de tracemalloc (incluye los arrays de NumPy) y
+    `rss_mb` el aumento de memoria residente del proceso más la de FFmpeg si el
+    decodificador lo lanza.
+    """
+    width, height = size
+    dst = np.empty((height, width, 3), dtype=np.uint8)
+    rss_inicial = memoria_rss()
+    tracemalloc.start()
+    dec = open_decoder(input_path, size, decodificador)
+    hechos = 0
+    inicio = time.perf_counter()
+    try:
+        while hechos < fotogramas and dec.read_into(dst):
+            hechos += 1
+        segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        proceso = getattr(dec, "proc", None)
+        rss = memoria_rss() - rss_inicial + (memoria_rss(proceso.pid) if proceso else 0.0)
+    finally:
+        tracemalloc.stop()
+        dec.release()
+    return {
+        "fps": hechos / segundos if segundos else 0.0,
+        "fotogramas": hechos,
+        "pico_python_mb": pico / 1e6,
+        "rss_mb": rss,
+    }
+
+
+def comparar_decodificadores(input_path, fotogramas=300, decodificadores=None):
+    """Decodificación, saltos y arrastre con cada backend de `decoder.DECODERS` sobre el mismo video."""
+    return {
+        nombre: {
+            "decodificacion": medir_decodificacion(input_path, fotogramas, decodificador=nombre),
+            "saltos": medir_saltos(input_path, decodificador=nombre),
+            "arrastre": medir_arrastre(input_path, decodificador=nombre),
+        }
+        for nombre in decodificadores or DECODERS
+    }
+
+
+def medir_reproduccion(input_path, segundos=5.0, velocidad=1.0, decodificador="cv2"):
+    """Ejecuta `PlaybackEngine` sin interfaz durante `segundos` y devuelve sus estadísticas."""
+    dec = open_decoder(input_path, PREVIEW_SIZE, decodificador)
+    motor = PlaybackEngine(capacity=8, size=PREVIEW_SIZE)
+    try:
+        motor.start(dec, dec.info.fps, velocidad)
+        fin = time.perf_counter() + segundos
+        while time.perf_counter() < fin and motor.active:
+            frame, espera = motor.poll()
+            if frame is not None:
+                motor.release()
+            else:
+                time.sleep(min(espera, 0.005))
+        motor.stop()
+    finally:
+        dec.release()
+    stats = motor.stats()
+    return {clave: stats[clave] for clave in ("output_fps", "decode_ms_avg", "decode_ms_max", "dropped", "skipped", "drift_ms_avg")}
+
+
+def medir_exportacion(input_path, rangos=RANGOS_SINTETICOS, fps=30):
+    """Rendimiento de la exportación en una sola pasada: fps y veces tiempo real."""
+    carpeta = tempfile.mkdtemp(prefix="app-super-bench-")
+    try:
+        inicio = time.perf_counter()
+        ok = exportar_filtro_complejo(input_path, os.path.join(carpeta, "final.mp4"), rangos=rangos)
+        segundos = time.perf_counter() - inicio
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    duracion = sum(d for _, d in rangos)
+    return {
+        "ok": ok,
+        "segundos": segundos,
+        "fps": duracion * fps / segundos if segundos else 0.0,
+        "tiempo_real": duracion / segundos if segundos else 0.0,
+    }
+
+
+def bateria(tamanos=SUITE_TAMANOS, fps=30):
+    """
+    Batería reproducible: genera videos sintéticos y mide latencia de salto y
+    de arrastre, decodificación, reproducción (con cada decodificador) y
+    exportación en cada resolución.
+    """
+    resultados = {
+        "entorno": {
+            "python": platform.python_version(),
+            "sistema": platform.platform(),
+            "nucleos": os.cpu_count(),
+            "opencv": cv2.__version__,
+        },
+        "videos": {},
+    }
+    carpeta = tempfile.mkdtemp(prefix="app-super-bench-")
+    try:
+        for tamano in tamanos:
+            video = generar_video_sintetico(os.path.join(carpeta, f"sintetico_{tamano}.mp4"), tamano=tamano, fps=fps)
+            print(f"Midiendo {tamano}...")
+            resultados["videos"][tamano] = {
+                nombre: {
+                    "saltos": medir_saltos(video, decodificador=nombre),
+                    "arrastre": medir_arrastre(video, decodificador=nombre),
+                    "decodificacion": medir_decodificacion(video, decodificador=nombre),
+                    "reproduccion": medir_reproduccion(video, decodificador=nombre),
+                }
+                for nombre in DECODERS
+            }
+            resultados["videos"][tamano]["exportacion"] = medir_exportacion(video, fps=fps)
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return resultados
+
+
+def _aplanar(datos, prefijo=""):
+    """{'a': {'b': 1}} -> {'a.b': 1}, solo con valores numéricos."""
+    plano = {}
+    for clave, valor in datos.items():
+        if isinstance(valor, dict):
+            plano.update(_aplanar(valor, f"{prefijo}{clave}."))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            plano[f"{prefijo}{clave}"] = valor
+    return plano
+
+
+def comparar_resultados(anterior, actual):
+    """Imprime cada métrica de la batería con su variación respecto a una ejecución anterior."""
+    antes = _aplanar(anterior.get("videos", {}))
+    ahora = _aplanar(actual.get("videos", {}))
+    for clave in sorted(ahora):
+        if clave in antes and antes[clave]:
+            cambio = (ahora[clave] - antes[clave]) / antes[clave] * 100
+            print(f"{clave:45s} {antes[clave]:10.2f} -> {ahora[clave]:10.2f} ({cambio:+6.1f} %)")
+        else:
+            print(f"{clave:45s} {'':10s}    {ahora[clave]:10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de exportación, saltos y reproducción.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_exp = sub.add_parser("exportacion", help="Compara clips + concat contra filter_complex.")
+    p_exp.add_argument("video")
+    p_perf = sub.add_parser("perfiles", help="Mide cada perfil de exportación.")
+    p_perf.add_argument("video", nargs="?", help="Video de entrada (por defecto uno sintético).")
+    p_dec = sub.add_parser("decodificadores", help="Compara los backends de decodificación (fps, memoria, saltos).")
+    p_dec.add_argument("video")
+    p_dec.add_argument("--fotogramas", type=int, default=300)
+    p_suite = sub.add_parser("bateria", help="Saltos, reproducción y exportación sobre videos sintéticos.")
+    p_suite.add_argument("--salida", help="Guardar los resultados en un JSON.")
+    p_suite.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar.")
+    args = parser.parse_args()
+
+    if args.comando == "bateria":
+        resultados = bateria()
+        if args.salida:
+            with open(args.salida, "w", encoding="utf-8") as f:
+                json.dump(resultados, f, indent=2)
+        anterior = {}
+        if args.comparar:
+            with open(args.comparar, "r", encoding="utf-8") as f:
+                anterior = json.load(f)
+        comparar_resultados(anterior, resultados)
+        raise SystemExit(0)
+
+    if args.comando == "decodificadores":
+        print(f"{'backend':8s} {'fps':>8s} {'pico MB':>8s} {'RSS MB':>8s} {'salto ms':>9s} {'p95 ms':>8s} "
+              f"{'arrastre ms':>12s} {'p95 ms':>8s}")
+        for nombre, datos in comparar_decodificadores(args.video, args.fotogramas).items():
+            dec, saltos, arrastre = datos["decodificacion"], datos["saltos"], datos["arrastre"]
+            print(f"{nombre:8s} {dec['fps']:8.1f} {dec['pico_python_mb']:8.2f} {dec['rss_mb']:8.1f} "
+                  f"{saltos['media_ms']:9.2f} {saltos['p95_ms']:8.2f} "
+                  f"{arrastre['media_ms']:12.2f} {arrastre['p95_ms']:8.2f}")
+        raise SystemExit(0)
+
+    if args.comando == "exportacion":
+        for nombre, datos in comparar_exportaciones(args.video).items():
+            if not datos["ok"]:
+                print(f"{nombre:16s} falló")
+                continue
+            print(f"{nombre:16s} {datos['segundos']:8.2f} s {datos['bytes'] / 1e6:10.2f} MB escritos")
+    else:
+        print(f"{'perfil':12s} {'fps':>8s} {'MB':>8s} {'CPU s':>8s} {'pared s':>8s}")
+        for nombre, datos in comparar_perfiles(args.video).items():
+            if not datos["ok"]:
+                print(f"{nombre:12s} falló")
+                continue
+            print(f"{nombre:12s} {datos['fps']:8.1f} {datos['bytes'] / 1e6:8.2f} {datos['cpu']:8.2f} {datos['segundos']:8.2f}")
@@ -0,0 +1,179 @@
+import os
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+import instrument
+from layout import PREVIEW_SIZE
+from media_info import MediaInfo, ffmpeg_exe, probe
+from playback import prepare_frame, resize_buffer
+
+# Backend por defecto; se puede fijar con la variable de entorno APP_SUPER_DECODER
+DEFAULT_DECODER = os.environ.get("APP_SUPER_DECODER", "cv2")
+
+FORWARD_SKIP_FRAMES = 15  # Saltos hacia delante más cortos que esto se leen sin relanzar FFmpeg
+
+
+class CaptureDecoder:
+    """
+    Decodificador de la previsualización sobre `cv2.VideoCapture`.
+
+    Como el de FFmpeg, entrega fotogramas RGB ya redimensionados y girados con
+    `read_into(dst)`; `position` es el próximo fotograma que se va a leer.
+    """
+
+    name = "cv2"
+
+    def __init__(self, path, size=PREVIEW_SIZE):
+        self.path = path
+        self.size = size
+        self.cap = cv2.VideoCapture(path)
+        self.info = MediaInfo.from_capture(path, self.cap)  # Desactiva además la autorrotación
+        self.rotation = self.info.rotation
+        self.tmp = resize_buffer(size, self.rotation)  # Reutilizado entre fotogramas
+
+    def is_open(self):
+        return self.cap.isOpened()
+
+    @property
+    def position(self):
+        return int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    def seek(self, frame, index=None):
+        """Posiciona el decodificador en `frame` (con el `SeekIndex` si se da) y devuelve el fotograma alcanzado."""
+        if index:
+            return index.seek(self.cap, frame)
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        return int(frame)
+
+    def grab(self):
+        """Avanza un fotograma sin convertirlo."""
+        return self.cap.grab()
+
+    def read_into(self, dst):
+        """Decodifica el siguiente fotograma en `dst` (RGB del tamaño de la previsualización)."""
+        started = time.perf_counter()
+        ret, frame = self.cap.read()
+        if not ret:
+            return False
+        decoded_at = time.perf_counter()
+        prepare_frame(frame, dst, self.size, self.rotation, self.tmp)
+        instrument.record("decode", decoded_at - started)
+        instrument.record("convert", time.perf_counter() - decoded_at)
+        return True
+
+    def release(self):
+        self.cap.release()
+
+
+class PipeDecoder:
+    """
+    Decodificador de la previsualización que lee fotogramas RGB crudos de
+    FFmpeg por una tubería.
+
+    FFmpeg aplica la rotación de los metadatos y escala al tamaño de la
+    previsualización, así que cada fotograma se copia directamente de la
+    tubería al búfer de destino con `readinto`. Los saltos relanzan FFmpeg con
+    `-ss` antes de la entrada, que busca el fotograma clave anterior y descarta
+    los fotogramas previos al destino.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, path, size=PREVIEW_SIZE):
+        self.path = path
+        self.size = size
+        self.info = probe(path)
+        self.rotation = self.info.rotation  # Ya aplicada por FFmpeg
+        width, height = size
+        self.scratch = np.empty((height, width, 3), dtype=np.uint8)  # Destino de grab()
+        self.proc = None
+        self.position = 0
+        self.closed = not self.info.width  # FFmpeg no encontró un flujo de video
+        if not self.closed:
+            self._spawn(0.0)
+
+    def is_open(self):
+        return not self.closed
+
+    def _spawn(self, seconds):
+        self._stop()
+        width, height = self.size
+        cmd = [ffmpeg_exe(), "-v", "error", "-nostdin"]
+        if seconds > 0:
+            cmd += ["-ss", f"{seconds:.6f}"]
+        cmd += [
+            "-i", self.path,
+            "-map", "0:v:0",
+            "-vf", f"scale={width}:{height}:flags=area",
+            "-fps_mode", "passthrough",  # Un fotograma de salida por cada fotograma decodificado (VFR incluido)
+            "-pix_fmt", "rgb24",
+            "-f", "rawvideo", "pipe:1",
+        ]
+        # Sin búfer de Python: readinto escribe directamente en el destino
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+
+    def _stop(self):
+        if self.proc:
+            self.proc.kill()
+            self.proc.stdout.close()
+            self.proc.wait()
+            self.proc = None
+
+    def seek(self, frame, index=None):
+        """Posiciona el decodificador en `frame` (con los PTS del `SeekIndex` si se da) y devuelve el fotograma alcanzado."""
+        frame = max(0, int(frame))
+        if self.closed:
+            return frame
+        if 0 <= frame - self.position <= FORWARD_SKIP_FRAMES:
+            # Más barato leer unos pocos fotogramas que volver a abrir el archivo
+            while self.position < frame and self.grab():
+                pass
+            return self.position
+
+        seconds = index.frame_to_time(frame) if index else frame / self.info.fps
+        # Medio fotograma antes para que el redondeo no descarte el fotograma buscado
+        self._spawn(max(0.0, seconds - 0.5 / self.info.fps))
+        self.position = frame
+        return frame
+
+    def _read_exact(self, dst):
+        view = memoryview(dst).cast("B")
+        filled = 0
+        while filled < len(view):
+            n = self.proc.stdout.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        self.position += 1
+        return True
+
+    def grab(self):
+        """Avanza un fotograma (hay que leerlo de la tubería igualmente)."""
+        return not self.closed and self._read_exact(self.scratch)
+
+    def read_into(self, dst):
+        """Lee el siguiente fotograma en `dst` (RGB contiguo del tamaño de la previsualización)."""
+        if self.closed:
+            return False
+        started = time.perf_counter()
+        ok = self._read_exact(dst)
+        instrument.record("decode", time.perf_counter() - started)
+        return ok
+
+    def release(self):
+        self.closed = True
+        self._stop()
+
+
+DECODERS = {CaptureDecoder.name: CaptureDecoder, PipeDecoder.name: PipeDecoder}
+
+
+def open_decoder(path, size=PREVIEW_SIZE, backend=None):
+    """Abre `path` con el backend `backend` ("cv2" o "ffmpeg"); por defecto `DEFAULT_DECODER`."""
+    backend = backend or DEFAULT_DECODER
+    if backend not in DECODERS:
+        raise ValueError(f"Decodificador desconocido: {backend} (disponibles: {', '.join(DECODERS)})")
+    return DECODERS[backend](path, size)
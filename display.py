@@ -0,0 +1,41 @@
+import time
+
+from PIL import Image, ImageTk
+
+import instrument
+from layout import PREVIEW_SIZE
+
+
+class DisplaySurface:
+    """
+    Superficie de previsualización que reutiliza un único `PhotoImage` y una
+    imagen intermedia entre fotogramas, en lugar de crear imágenes nuevas.
+
+    Los fotogramas llegan ya girados y en RGB desde el decodificador (ver
+    `decoder.py`).
+    """
+
+    def __init__(self, label, size=PREVIEW_SIZE):
+        self.label = label
+        self.size = size
+        self.photo = ImageTk.PhotoImage("RGB", size)
+        # Imagen intermedia reutilizada en cada fotograma. Debe ocupar un único
+        # bloque de memoria (Image.new no lo garantiza): si no, paste la copia a
+        # un bloque nuevo en cada fotograma
+        self.image = Image.Image()._new(Image.core.new_block("RGB", size))
+        assert self.image.im.isblock(), "La imagen de la superficie debe ser un bloque único"
+        self.attached = False
+
+    def show(self, rgb):
+        """Copia un fotograma RGB del tamaño de la superficie en el `PhotoImage`."""
+        started = time.perf_counter()
+        # Copiar en la imagen reutilizada en vez de crear una por fotograma; al
+        # tener el mismo modo que el PhotoImage, paste la vuelca a Tk sin convertir
+        self.image.frombytes(rgb)  # Escribe en el bloque existente sin reasignarlo
+        self.photo.paste(self.image)
+        instrument.record("display", time.perf_counter() - started)
+        if not self.attached:
+            self.label.config(image=self.photo)
+            self.label.image = self.photo
+            self.attached = True
+
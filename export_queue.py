@@ -0,0 +1,131 @@
+import itertools
+import os
+import queue
+import subprocess
+import threading
+import time
+
+import instrument
+from media_info import ffmpeg_exe
+from backup import comando_filtro_complejo, tiene_audio, PERFIL_POR_DEFECTO
+
+
+def rangos_desde_clips(clip_data):
+    """Convierte `ClipEditorApp.clip_data` en una lista de (inicio, duración) válidos."""
+    rangos = []
+    for clip in clip_data.values():
+        if clip["end"] > clip["start"]:
+            rangos.append((clip["start"], clip["end"] - clip["start"]))
+    return rangos
+
+
+class ExportJob:
+    """Trabajo de exportación con su estado, progreso y ETA."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, input_path, output_final, rangos, perfil=PERFIL_POR_DEFECTO):
+        self.id = next(self._ids)
+        self.perfil = perfil
+        self.input_path = input_path
+        self.output_final = output_final
+        self.rangos = list(rangos)
+        self.duracion = sum(duracion for _, duracion in self.rangos)
+        self.estado = "en cola"  # en cola, exportando, ok, error, cancelado
+        self.progreso = 0.0  # Fracción completada (0 a 1)
+        self.eta = None  # Segundos restantes estimados
+        self.error = None
+        self.cancelado = threading.Event()
+        self.proceso = None
+
+    def cancelar(self):
+        self.cancelado.set()
+        if self.proceso and self.proceso.poll() is None:
+            self.proceso.terminate()
+
+
+class ExportQueue:
+    """
+    Cola de exportaciones que se ejecutan una tras otra en un hilo propio.
+
+    El progreso se lee de la salida `-progress` de FFmpeg; la interfaz consulta
+    el estado de los trabajos desde su propio hilo sin bloquearse.
+    """
+
+    def __init__(self):
+        self.cola = queue.Queue()
+        self.trabajos = []
+        self.actual = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def encolar(self, input_path, output_final, rangos, perfil=PERFIL_POR_DEFECTO):
+        """Añade una exportación a la cola y devuelve el trabajo creado."""
+        trabajo = ExportJob(input_path, output_final, rangos, perfil)
+        self.trabajos.append(trabajo)
+        self.cola.put(trabajo)
+        return trabajo
+
+    def cancelar(self, trabajo=None):
+        """Cancela el trabajo indicado o, si no se indica, el que se está exportando."""
+        trabajo = trabajo or self.actual
+        if trabajo:
+            trabajo.cancelar()
+
+    def pendientes(self):
+        return [t for t in self.trabajos if t.estado in ("en cola", "exportando")]
+
+    def _run(self):
+        while True:
+            trabajo = self.cola.get()
+            if trabajo.cancelado.is_set():
+                trabajo.estado = "cancelado"
+                continue
+            self.actual = trabajo
+            try:
+                self._exportar(trabajo)
+            except Exception as e:
+                trabajo.estado = "error"
+                trabajo.error = str(e)
+                instrument.error("Error al exportar el trabajo %d: %s", trabajo.id, e)
+            finally:
+                self.actual = None
+
+    def _exportar(self, trabajo):
+        os.makedirs(os.path.dirname(os.path.abspath(trabajo.output_final)), exist_ok=True)
+        cmd = comando_filtro_complejo(ffmpeg_exe(), trabajo.input_path, trabajo.output_final,
+                                      trabajo.rangos, tiene_audio(trabajo.input_path), trabajo.perfil)
+        # Informe de progreso legible por máquina en stdout
+        cmd[1:1] = ["-v", "error", "-nostats", "-progress", "pipe:1"]
+
+        trabajo.estado = "exportando"
+        instrument.info("Exportando trabajo %d: %s", trabajo.id, trabajo.output_final)
+        inicio = time.perf_counter()
+        trabajo.proceso = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if trabajo.cancelado.is_set():
+            trabajo.proceso.terminate()
+
+        for linea in trabajo.proceso.stdout:
+            clave, _, valor = linea.strip().partition("=")
+            if clave in ("out_time_us", "out_time_ms") and valor.isdigit() and trabajo.duracion:
+                # out_time_ms también está en microsegundos en FFmpeg
+                trabajo.progreso = min(1.0, int(valor) / 1e6 / trabajo.duracion)
+                if trabajo.progreso > 0:
+                    transcurrido = time.perf_counter() - inicio
+                    trabajo.eta = transcurrido * (1 - trabajo.progreso) / trabajo.progreso
+        stderr = trabajo.proceso.stderr.read()
+        trabajo.proceso.wait()
+        instrument.record("ffmpeg", time.perf_counter() - inicio)
+
+        if trabajo.cancelado.is_set():
+            trabajo.estado = "cancelado"
+            instrument.info("Trabajo %d cancelado.", trabajo.id)
+        elif trabajo.proceso.returncode != 0:
+            trabajo.estado = "error"
+            trabajo.error = stderr
+            instrument.error("Error en FFmpeg: %s", stderr)
+        else:
+            trabajo.estado = "ok"
+            trabajo.progreso = 1.0
+            trabajo.eta = 0
+            instrument.info("Trabajo %d exportado en %.1f s", trabajo.id, time.perf_counter() - inicio)
@@ -0,0 +1,118 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import media_cache
+from layout import STRIP_SIZE
+from playback import video_rotation
+
+ROTATE_CODES = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+THUMB_COUNT = 32  # Miniaturas en la tira completa
+FIRST_PASS = 8  # Miniaturas de la primera pasada (gruesa)
+
+
+def _thumbnail(frame, width, height, rotation=0):
+    """Escala el fotograma a la altura de la tira y recorta el centro al ancho de la ranura."""
+    h, w = frame.shape[:2]
+    if rotation in (90, 270):
+        w, h = h, w
+    scaled_w = max(width, int(round(w * height / h)))
+    # Redimensionar antes de girar para rotar solo la miniatura
+    dsize = (height, scaled_w) if rotation in (90, 270) else (scaled_w, height)
+    frame = cv2.resize(frame, dsize, interpolation=cv2.INTER_AREA)
+    if rotation in ROTATE_CODES:
+        frame = cv2.rotate(frame, ROTATE_CODES[rotation])  # Misma orientación que la previsualización
+    x = (scaled_w - width) // 2
+    frame = frame[:, x:x + width]
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+class Filmstrip:
+    """
+    Tira de miniaturas equiespaciadas para el canvas `time_scale`.
+
+    Se genera de forma progresiva (de grueso a fino) en un grupo de hilos, cada
+    uno con su propia captura, y se guarda en disco como una hoja de sprites PNG
+    asociada al hash del video.
+    """
+
+    def __init__(self, video_path, count=THUMB_COUNT, size=STRIP_SIZE, workers=4, cancelled=None):
+        self.video_path = video_path
+        self.count = count
+        self.size = size
+        self.workers = workers
+        self.slot_width = size[0] // count
+        self.strip = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        self.cancelled = cancelled or threading.Event()  # Cualquier objeto con set()/is_set()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def cache_file(self):
+        return media_cache.cache_path("filmstrip", self.video_path, f"_{self.count}x{self.size[1]}.png")
+
+    def load_cached(self):
+        """Carga la tira desde la caché; devuelve True si estaba disponible."""
+        cache_file = self.cache_file()
+        if not os.path.isfile(cache_file):
+            return False
+        sheet = cv2.imread(cache_file, cv2.IMREAD_COLOR)
+        if sheet is None or sheet.shape != self.strip.shape:
+            return False
+        cv2.cvtColor(sheet, cv2.COLOR_BGR2RGB, dst=self.strip)
+        return True
+
+    def _render_chunk(self, indices):
+        """Decodifica las miniaturas de `indices` con una captura propia."""
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            rotation = video_rotation(cap)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            thumbs = []
+            for idx in indices:
+                if self.cancelled.is_set():
+                    break
+                frame_no = int((idx + 0.5) / self.count * total_frames)
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+                ret, frame = cap.read()
+                if ret:
+                    thumbs.append((idx, _thumbnail(frame, self.slot_width, self.size[1], rotation)))
+            return thumbs
+        finally:
+            cap.release()
+
+    def generate(self, on_update):
+        """
+        Genera la tira llamando a `on_update(strip)` tras cada pasada.
+
+        La primera pasada produce `FIRST_PASS` miniaturas que cubren también las
+        ranuras vecinas; cada pasada siguiente duplica la resolución.
+        """
+        if self.load_cached():
+            on_update(self.strip.copy())
+            return
+
+        stride = max(1, self.count // FIRST_PASS)
+        done = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while stride >= 1 and not self.cancelled.is_set():
+                indices = [i for i in range(0, self.count, stride) if i not in done]
+                chunk = max(1, -(-len(indices) // self.workers))
+                futures = [pool.submit(self._render_chunk, indices[i:i + chunk]) for i in range(0, len(indices), chunk)]
+                for future in futures:
+                    for idx, thumb in future.result():
+                        # Cada miniatura cubre su ranura y las siguientes hasta la próxima pasada
+                        for slot in range(idx, min(idx + stride, self.count)):
+                            x = slot * self.slot_width
+                            self.strip[:, x:x + self.slot_width] = thumb
+                        done.add(idx)
+                if not self.cancelled.is_set():
+                    on_update(self.strip.copy())
+                stride //= 2
+
+        if not self.cancelled.is_set() and len(done) == self.count:
+            cv2.imwrite(self.cache_file(), cv2.cvtColor(self.strip, cv2.COLOR_RGB2BGR))
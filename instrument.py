@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN", ERROR: "ERROR"}
+_LEVELS_BY_NAME = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "WARN": WARNING, "ERROR": ERROR}
+
+# Nivel mínimo de los mensajes; se puede fijar con la variable de entorno APP_SUPER_LOG
+level = _LEVELS_BY_NAME.get(os.environ.get("APP_SUPER_LOG", "INFO").upper(), INFO)
+
+
+def set_level(value):
+    """Cambia el nivel mínimo (número o nombre: DEBUG, INFO, WARNING, ERROR)."""
+    global level
+    level = _LEVELS_BY_NAME[value.upper()] if isinstance(value, str) else value
+
+
+def enabled(lvl):
+    return lvl >= level
+
+
+def log(lvl, msg, *args):
+    """
+    Escribe un mensaje si su nivel está activo.
+
+    El texto se formatea con `msg % args` solo cuando se va a mostrar, para que
+    los mensajes de depuración no cuesten nada en las rutas calientes.
+    """
+    if lvl < level:
+        return
+    print(f"[{LEVEL_NAMES.get(lvl, lvl)}] {msg % args if args else msg}")
+
+
+def debug(msg, *args):
+    if DEBUG >= level:
+        log(DEBUG, msg, *args)
+
+
+def info(msg, *args):
+    if INFO >= level:
+        log(INFO, msg, *args)
+
+
+def warning(msg, *args):
+    if WARNING >= level:
+        log(WARNING, msg, *args)
+
+
+def error(msg, *args):
+    log(ERROR, msg, *args)
+
+
+class StageStats:
+    """Contadores acumulados de una etapa: llamadas, total, máximo y último tiempo."""
+
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+_stages = {}
+_lock = threading.Lock()
+
+
+def record(stage, seconds):
+    """Suma una medición de `seconds` a la etapa `stage` (decode, convert, display, seek, ffmpeg...)."""
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = StageStats()
+        stats.add(seconds)
+
+
+@contextmanager
+def timed(stage):
+    """Mide el bloque `with` y lo registra en `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def stage_stats():
+    """Resumen por etapa: llamadas, media, máximo y último tiempo en milisegundos."""
+    with _lock:
+        items = [(name, s.count, s.total, s.max, s.last) for name, s in _stages.items()]
+    return {
+        name: {
+            "count": count,
+            "avg_ms": total / count * 1000 if count else 0.0,
+            "max_ms": maximum * 1000,
+            "last_ms": last * 1000,
+            "total_s": total,
+        }
+        for name, count, total, maximum, last in items
+    }
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+
+def report(lvl=INFO):
+    """Escribe una línea por etapa con sus tiempos."""
+    if lvl < level:
+        return
+    for name, s in sorted(stage_stats().items()):
+        log(lvl, "%-10s %7d llamadas  media %8.2f ms  máx %8.2f ms  total %8.2f s",
+            name, s["count"], s["avg_ms"], s["max_ms"], s["total_s"])
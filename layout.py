@@ -0,0 +1,2 @@
+PREVIEW_SIZE = (800, 400)  # Tamaño (ancho, alto) del panel de previsualización
+STRIP_SIZE = (800, 40)  # Tamaño (ancho, alto) de la tira sobre la línea de tiempo
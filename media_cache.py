@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+
+CACHE_ROOT = os.environ.get(
+    "APP_SUPER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "app-super"),
+)
+
+
+def cache_dir(kind):
+    """Devuelve (y crea si hace falta) la carpeta de caché para un tipo de dato."""
+    path = os.path.join(CACHE_ROOT, kind)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_key(path):
+    """Clave estable de un archivo a partir de su ruta, tamaño y fecha de modificación."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    raw = f"{path}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def cache_path(kind, path, suffix):
+    """Ruta del archivo de caché de `kind` correspondiente al video `path`."""
+    return os.path.join(cache_dir(kind), file_key(path) + suffix)
+
+
+def load_json(cache_file):
+    """Lee un archivo JSON de caché; devuelve None si no existe o está dañado."""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(cache_file, data):
+    """Escribe un archivo JSON de caché de forma atómica."""
+    tmp = cache_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, cache_file)
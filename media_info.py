@@ -0,0 +1,120 @@
+import functools
+import re
+import subprocess
+import threading
+
+import media_cache
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_exe():
+    """Ruta del FFmpeg incluido con imageio_ffmpeg, resuelta una sola vez por proceso."""
+    from imageio_ffmpeg import get_ffmpeg_exe
+    return get_ffmpeg_exe()
+
+
+class MediaInfo:
+    """
+    Datos del video que la interfaz consulta a menudo (fps, fotogramas,
+    duración, tamaño y rotación), leídos una sola vez al abrir el archivo
+    para no preguntar a la captura en cada evento.
+    """
+
+    def __init__(self, path, fps, frame_count, width=0, height=0, rotation=0, has_audio=None, codec=None, pix_fmt=None,
+                 profile=None, audio_codec=None, sample_rate=None, channels=None):
+        self.path = path
+        self.fps = fps or 30.0
+        self.frame_count = max(1, frame_count)
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.has_audio = has_audio  # None si no se ha comprobado
+        self.codec = codec
+        self.pix_fmt = pix_fmt
+        self.profile = profile  # Perfil del códec de video ("High", "Main"...)
+        self.audio_codec = audio_codec
+        self.sample_rate = sample_rate
+        self.channels = channels  # Disposición de canales ("stereo", "mono", "5.1"...)
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps
+
+    @property
+    def resolution(self):
+        return f"{self.width}x{self.height}"
+
+    @classmethod
+    def from_capture(cls, path, cap):
+        """Lee los datos de una captura ya abierta (ajusta además su autorrotación)."""
+        import cv2
+        from playback import video_rotation
+
+        return cls(
+            path,
+            cap.get(cv2.CAP_PROP_FPS),
+            int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            video_rotation(cap),
+        )
+
+    @classmethod
+    def from_header(cls, path, header):
+        """Interpreta la información de flujos que imprime `ffmpeg -i`."""
+        video = re.search(r"Stream #\S+.*?: Video: (\w+).*?, (\w+)(?:\(.*?\))?, (\d+)x(\d+)", header)
+        fps = re.search(r"Stream #\S+.*?: Video: .*?, ([\d.]+) (?:fps|tbr)", header)
+        duration = re.search(r"Duration: (\d+):(\d+):([\d.]+)", header)
+        rotation = re.search(r"displaymatrix: rotation of (-?[\d.]+) degrees", header)
+        profile = re.search(r"Stream #\S+.*?: Video: \w+ \(([^)/]+)\)", header)
+        audio = re.search(r"Stream #\S+.*?: Audio: (\w+).*?, (\d+) Hz, ([^,\n]+)", header)
+
+        fps = float(fps.group(1)) if fps else 30.0
+        seconds = 0.0
+        if duration:
+            h, m, s = duration.groups()
+            seconds = int(h) * 3600 + int(m) * 60 + float(s)
+        return cls(
+            path,
+            fps,
+            int(round(seconds * fps)),
+            int(video.group(3)) if video else 0,
+            int(video.group(4)) if video else 0,
+            # La matriz indica el giro antihorario; aquí se usa el horario
+            int(round(-float(rotation.group(1)))) % 360 if rotation else 0,
+            has_audio=re.search(r"Stream #\S+.*?: Audio:", header) is not None,
+            codec=video.group(1) if video else None,
+            pix_fmt=video.group(2) if video else None,
+            profile=profile.group(1) if profile else None,
+            audio_codec=audio.group(1) if audio else None,
+            sample_rate=int(audio.group(2)) if audio else None,
+            channels=audio.group(3).strip() if audio else None,
+        )
+
+    def __repr__(self):
+        return (f"MediaInfo({self.path!r}, {self.fps:.3f} fps, {self.frame_count} fotogramas, "
+                f"{self.width}x{self.height}, {self.rotation}°)")
+
+
+_probes = {}  # Clave del archivo -> MediaInfo
+_probes_lock = threading.Lock()
+
+
+def probe(path):
+    """
+    `MediaInfo` de `path` leído de la cabecera de FFmpeg.
+
+    Cada archivo se analiza una sola vez por proceso; la clave incluye tamaño y
+    fecha de modificación, así que un archivo reescrito se vuelve a analizar.
+    """
+    key = media_cache.file_key(path)
+    with _probes_lock:
+        info = _probes.get(key)
+    if info is not None:
+        return info
+    result = subprocess.run([ffmpeg_exe(), "-hide_banner", "-i", path],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    info = MediaInfo.from_header(path, result.stderr)
+    with _probes_lock:
+        _probes[key] = info
+    return info
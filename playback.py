@@ -0,0 +1,330 @@
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from layout import PREVIEW_SIZE
+
+
+def video_rotation(cap):
+    """
+    Grados de rotación (horaria) que indican los metadatos del flujo.
+
+    Desactiva la autorrotación de OpenCV para aplicar la rotación nosotros en el
+    mismo paso que la conversión de color.
+    """
+    orientation = getattr(cv2, "CAP_PROP_ORIENTATION_META", None)
+    if orientation is None:
+        return 0
+    cap.set(cv2.CAP_PROP_ORIENTATION_AUTO, 0)
+    return int(cap.get(orientation)) % 360
+
+
+def resize_buffer(size=PREVIEW_SIZE, rotation=0):
+    """Búfer intermedio para `prepare_frame` (el fotograma redimensionado antes de girar)."""
+    width, height = size
+    if rotation in (90, 270):
+        width, height = height, width  # Se redimensiona antes de girar
+    return np.empty((height, width, 3), dtype=np.uint8)
+
+
+def prepare_frame(frame, dst, size=PREVIEW_SIZE, rotation=0, tmp=None):
+    """
+    Redimensiona un fotograma BGR y lo escribe en `dst` como RGB, rotándolo
+    solo si `rotation` lo indica.
+
+    `tmp` es un búfer de `resize_buffer` reutilizable entre llamadas.
+    """
+    if tmp is None:
+        tmp = resize_buffer(size, rotation)
+    height, width = tmp.shape[:2]
+    cv2.resize(frame, (width, height), dst=tmp, interpolation=cv2.INTER_AREA)
+
+    # Rotación y BGR -> RGB en una sola copia
+    if rotation == 180:
+        # Invertir el búfer completo gira 180 grados e intercambia los canales
+        np.copyto(dst.reshape(-1), tmp.reshape(-1)[::-1])
+    elif rotation == 90:
+        np.copyto(dst, np.rot90(tmp, -1)[:, :, ::-1])
+    elif rotation == 270:
+        np.copyto(dst, np.rot90(tmp, 1)[:, :, ::-1])
+    else:
+        cv2.cvtColor(tmp, cv2.COLOR_BGR2RGB, dst=dst)
+    return dst
+
+
+class FrameRing:
+    """Anillo acotado de fotogramas RGB preasignados listos para mostrar."""
+
+    def __init__(self, capacity=8, size=PREVIEW_SIZE):
+        width, height = size
+        self.capacity = capacity
+        self.buffers = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        self.indices = [0] * capacity  # Número de fotograma de cada ranura
+        self.head = 0  # Próxima ranura a leer
+        self.count = 0  # Ranuras ocupadas
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def __len__(self):
+        with self.cond:
+            return self.count
+
+    def acquire_write(self, timeout=0.1):
+        """Espera una ranura libre y devuelve su índice, o None si el anillo se cerró."""
+        with self.cond:
+            while self.count == self.capacity and not self.closed:
+                self.cond.wait(timeout)
+            if self.closed:
+                return None
+            return (self.head + self.count) % self.capacity
+
+    def commit_write(self, frame_index):
+        """Publica la ranura escrita tras `acquire_write`."""
+        with self.cond:
+            slot = (self.head + self.count) % self.capacity
+            self.indices[slot] = frame_index
+            self.count += 1
+            self.cond.notify_all()
+
+    def peek(self):
+        """Devuelve (ranura, número de fotograma) del siguiente fotograma, o None si está vacío."""
+        with self.cond:
+            if self.count == 0:
+                return None
+            return self.head, self.indices[self.head]
+
+    def peek_next(self):
+        """Número de fotograma del elemento que sigue al actual, o None."""
+        with self.cond:
+            if self.count < 2:
+                return None
+            return self.indices[(self.head + 1) % self.capacity]
+
+    def pop(self):
+        """Libera la ranura de lectura actual."""
+        with self.cond:
+            if self.count:
+                self.head = (self.head + 1) % self.capacity
+                self.count -= 1
+                self.cond.notify_all()
+
+    def clear(self):
+        with self.cond:
+            self.head = 0
+            self.count = 0
+            self.closed = False
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class PlaybackEngine:
+    """
+    Motor de reproducción productor/consumidor guiado por reloj.
+
+    Un hilo lee de un decodificador (ver `decoder.py`) y llena un `FrameRing` con
+    fotogramas ya preparados; el
+    lado de la interfaz los extrae con `poll()`. El instante de presentación de
+    cada fotograma se calcula a partir de su PTS y de la velocidad actual, que
+    puede cambiarse en vivo con `set_speed()`. Si decodificar cada fotograma no
+    cabe en el presupuesto de tiempo, el decodificador salta fotogramas con
+    `grab()`; los que aun así llegan tarde se descartan.
+    """
+
+    MAX_SKIP_SECONDS = 2.0  # Máximo de video que se salta de una vez para alcanzar el reloj
+
+    def __init__(self, capacity=8, size=PREVIEW_SIZE, lock=None):
+        self.ring = FrameRing(capacity, size)
+        self.size = size
+        self.lock = lock or threading.Lock()  # Protege el acceso al decodificador
+        self.decoder = None
+        self.thread = None
+        self.running = False
+        self.eof = False
+        self.fps = 30.0
+        self.speed = 1.0
+        self.first_index = 0
+        self.pts_of = self._default_pts
+        self.anchor_wall = None  # Instante de reloj del ancla
+        self.anchor_media = 0.0  # Tiempo de video en el ancla
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.decoded = 0
+        self.skipped = 0
+        self.displayed = 0
+        self.dropped = 0
+        self.decode_time_avg = 0.0  # Media móvil exponencial en segundos
+        self.decode_time_max = 0.0
+        self.first_display = None
+        self.drift_avg = 0.0  # Retraso medio de presentación respecto al reloj
+        self.drift_max = 0.0
+
+    def _default_pts(self, frame_index):
+        return frame_index / self.fps
+
+    @property
+    def active(self):
+        return self.running or len(self.ring) > 0
+
+    def start(self, decoder, fps, speed=1.0, pts_of=None):
+        """
+        Comienza a decodificar desde la posición actual de `decoder`.
+
+        `pts_of(frame)` devuelve el tiempo de presentación de un fotograma (por
+        ejemplo `SeekIndex.frame_to_time`); por defecto se usa frame / fps.
+        """
+        self.stop()
+        self.decoder = decoder
+        self.fps = fps if fps and fps > 0 else 30
+        self.speed = speed
+        self.pts_of = pts_of or self._default_pts
+        with self.lock:
+            self.first_index = decoder.position
+        self.anchor_wall = None
+        self.eof = False
+        self._reset_stats()
+        self.ring.clear()
+        self.running = True
+        self.thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Detiene el hilo decodificador y vacía el anillo."""
+        self.running = False
+        self.ring.close()
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        self.ring.clear()
+
+    def set_speed(self, speed, now=None):
+        """Cambia la velocidad sin reiniciar: el reloj se reancla en la posición actual."""
+        now = time.perf_counter() if now is None else now
+        if self.anchor_wall is not None:
+            self.anchor_media = self.media_time(now)
+            self.anchor_wall = now
+        self.speed = speed
+
+    def media_time(self, now):
+        """Tiempo de video que corresponde al instante de reloj `now`."""
+        return self.anchor_media + (now - self.anchor_wall) * self.speed
+
+    def frame_due(self, frame_index):
+        """Instante de reloj en que debe mostrarse `frame_index`."""
+        return self.anchor_wall + (self.pts_of(frame_index) - self.anchor_media) / self.speed
+
+    def _frames_to_skip(self, index):
+        """Fotogramas a saltar con `grab()` antes de decodificar el siguiente."""
+        if not self.decoded:
+            return 0
+        # Presupuesto: si decodificar cuesta más que el intervalo entre fotogramas, saltar
+        interval = 1 / (self.fps * self.speed)
+        skip = max(0, math.ceil(self.decode_time_avg / interval) - 1)
+
+        # Si el reloj ya va por delante del próximo fotograma, alcanzarlo
+        if self.anchor_wall is not None:
+            ready_at = self.media_time(time.perf_counter() + self.decode_time_avg)
+            behind = ready_at - self.pts_of(index)
+            if behind > 0:
+                skip = max(skip, int(behind * self.fps))
+        return min(skip, int(self.MAX_SKIP_SECONDS * self.fps))
+
+    def _decode_loop(self):
+        index = self.first_index
+        while self.running:
+            slot = self.ring.acquire_write()
+            if slot is None:
+                break
+
+            started = time.perf_counter()
+            with self.lock:
+                if not self.decoder or not self.decoder.is_open():
+                    break
+                skip = self._frames_to_skip(index)
+                for _ in range(skip):
+                    if not self.decoder.grab():  # Avanzar sin convertir el fotograma
+                        break
+                    index += 1
+                    self.skipped += 1
+                # El decodificador registra sus propias etapas (decode, convert)
+                ret = self.decoder.read_into(self.ring.buffers[slot])
+            if not ret:
+                break
+
+            elapsed = time.perf_counter() - started
+            self.decode_time_avg = elapsed if not self.decoded else 0.9 * self.decode_time_avg + 0.1 * elapsed
+            self.decode_time_max = max(self.decode_time_max, elapsed)
+            self.decoded += 1
+
+            self.ring.commit_write(index)
+            index += 1
+
+        self.eof = True
+        self.running = False
+
+    def poll(self, now=None):
+        """
+        Devuelve (fotograma RGB o None, segundos hasta la próxima consulta).
+
+        Si se devuelve un fotograma, el llamador debe mostrarlo y luego invocar
+        `release()` para liberar su ranura.
+        """
+        now = time.perf_counter() if now is None else now
+        idle = 1 / (4 * self.fps * self.speed)
+        while True:
+            head = self.ring.peek()
+            if head is None:
+                return None, idle
+            slot, frame_index = head
+            if self.anchor_wall is None:
+                self.anchor_wall = now
+                self.anchor_media = self.pts_of(frame_index)
+            due = self.frame_due(frame_index)
+            if now < due:
+                return None, due - now
+
+            # Si el siguiente fotograma ya también toca, este llegó tarde: descartarlo
+            following = self.ring.peek_next()
+            if following is not None and now >= self.frame_due(following):
+                self.ring.pop()
+                self.dropped += 1
+                continue
+
+            drift = now - due
+            self.drift_avg = drift if not self.displayed else 0.9 * self.drift_avg + 0.1 * drift
+            self.drift_max = max(self.drift_max, drift)
+            if following is not None:
+                return self.ring.buffers[slot], max(0.0, self.frame_due(following) - now)
+            return self.ring.buffers[slot], idle
+
+    def release(self):
+        """Libera la ranura del fotograma devuelto por `poll()`."""
+        self.ring.pop()
+        if self.first_display is None:
+            self.first_display = time.perf_counter()
+        self.displayed += 1
+
+    def stats(self):
+        """Estadísticas de decodificación, cola, descartes, fps de salida y deriva del reloj."""
+        elapsed = time.perf_counter() - self.first_display if self.first_display else 0.0
+        return {
+            "speed": self.speed,
+            "decoded": self.decoded,
+            "skipped": self.skipped,
+            "displayed": self.displayed,
+            "dropped": self.dropped,
+            "queue_depth": len(self.ring),
+            "queue_capacity": self.ring.capacity,
+            "decode_ms_avg": self.decode_time_avg * 1000,
+            "decode_ms_max": self.decode_time_max * 1000,
+            "output_fps": (self.displayed - 1) / elapsed if elapsed > 0 else 0.0,
+            "drift_ms_avg": self.drift_avg * 1000,
+            "drift_ms_max": self.drift_max * 1000,
+        }
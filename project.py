@@ -0,0 +1,268 @@
+import bisect
+import json
+import os
+import struct
+import sys
+from array import array
+
+PROJECT_VERSION = 1
+BINARY_MAGIC = b"ASPJ"
+_HEADER = struct.Struct("<4sHII")  # magia, versión, nº de segmentos, bytes de la cabecera JSON
+
+
+class SegmentStore:
+    """
+    Almacén compacto de segmentos en columnas (`array` de enteros de 32 bits).
+
+    Cada segmento ocupa una ranura: archivo de origen, fotograma de entrada y
+    fotograma de salida (exclusivo). Las ranuras borradas se marcan con
+    origen -1 y se reutilizan en la siguiente inserción.
+    """
+
+    def __init__(self):
+        self.source = array("i")
+        self.start = array("i")
+        self.end = array("i")
+        self.free = []  # Ranuras libres para reutilizar
+        self.version = 0  # Cambia con cada modificación
+
+    def __len__(self):
+        return len(self.source) - len(self.free)
+
+    def add(self, source_id, start, end):
+        """Añade un segmento [start, end) y devuelve su ranura."""
+        if end <= start:
+            raise ValueError(f"Segmento vacío: {start}-{end}")
+        if self.free:
+            slot = self.free.pop()
+            self.source[slot], self.start[slot], self.end[slot] = source_id, start, end
+        else:
+            slot = len(self.source)
+            self.source.append(source_id)
+            self.start.append(start)
+            self.end.append(end)
+        self.version += 1
+        return slot
+
+    def update(self, slot, start, end):
+        if end <= start:
+            raise ValueError(f"Segmento vacío: {start}-{end}")
+        self.start[slot], self.end[slot] = start, end
+        self.version += 1
+
+    def remove(self, slot):
+        self.source[slot] = -1
+        self.free.append(slot)
+        self.version += 1
+
+    def get(self, slot):
+        """Devuelve (origen, entrada, salida) de la ranura."""
+        return self.source[slot], self.start[slot], self.end[slot]
+
+    def slots(self):
+        """Ranuras ocupadas, en orden de inserción."""
+        return [i for i, s in enumerate(self.source) if s >= 0]
+
+
+class IntervalIndex:
+    """
+    Índice de intervalos estático por archivo de origen.
+
+    Los segmentos se ordenan por fotograma de entrada y se guarda el máximo
+    acumulado de las salidas, de modo que "qué segmentos cubren t" y los
+    solapamientos se resuelven con una búsqueda binaria y un recorrido acotado.
+    """
+
+    def __init__(self, store):
+        self.by_source = {}
+        for slot in store.slots():
+            self.by_source.setdefault(store.source[slot], []).append((store.start[slot], store.end[slot], slot))
+        self.tables = {}
+        for source_id, items in self.by_source.items():
+            items.sort()
+            starts = [s for s, _, _ in items]
+            max_end = []
+            current = -1
+            for _, e, _ in items:
+                current = max(current, e)
+                max_end.append(current)
+            self.tables[source_id] = (starts, max_end, items)
+
+    def overlapping(self, source_id, start, end):
+        """Ranuras de `source_id` que se solapan con [start, end)."""
+        if source_id not in self.tables:
+            return []
+        starts, max_end, items = self.tables[source_id]
+        i = bisect.bisect_left(starts, end) - 1
+        result = []
+        # Recorrer hacia atrás mientras algún segmento anterior pueda llegar a `start`
+        while i >= 0 and max_end[i] > start:
+            s, e, slot = items[i]
+            if e > start:
+                result.append(slot)
+            i -= 1
+        result.reverse()
+        return result
+
+    def covering(self, source_id, frame):
+        """Ranuras de `source_id` que contienen el fotograma `frame`."""
+        return self.overlapping(source_id, frame, frame + 1)
+
+
+class Project:
+    """
+    Proyecto de edición con varios archivos de origen y sus segmentos.
+
+    Los puntos de entrada y salida se guardan en fotogramas; el orden de la
+    línea de tiempo es el orden de `timeline` (lista de ranuras).
+    """
+
+    def __init__(self):
+        self.sources = []  # [{"path": ..., "fps": ...}]
+        self.segments = SegmentStore()
+        self.timeline = []  # Ranuras en orden de reproducción
+        self._index = None
+        self._index_version = -1
+        self._offsets = None
+
+    def add_source(self, path, fps):
+        """Registra un archivo de origen y devuelve su identificador."""
+        path = os.path.abspath(path)
+        for i, source in enumerate(self.sources):
+            if source["path"] == path:
+                return i
+        self.sources.append({"path": path, "fps": float(fps)})
+        return len(self.sources) - 1
+
+    def add_segment(self, source_id, start_frame, end_frame):
+        """Añade un segmento al final de la línea de tiempo y devuelve su ranura."""
+        slot = self.segments.add(source_id, start_frame, end_frame)
+        self.timeline.append(slot)
+        self._offsets = None
+        return slot
+
+    def update_segment(self, slot, start_frame, end_frame):
+        self.segments.update(slot, start_frame, end_frame)
+        self._offsets = None
+
+    def remove_segment(self, slot):
+        self.segments.remove(slot)
+        self.timeline.remove(slot)
+        self._offsets = None
+
+    @property
+    def index(self):
+        """Índice de intervalos, reconstruido solo si los segmentos cambiaron."""
+        if self._index is None or self._index_version != self.segments.version:
+            self._index = IntervalIndex(self.segments)
+            self._index_version = self.segments.version
+        return self._index
+
+    def segments_at(self, source_id, seconds):
+        """Ranuras del archivo `source_id` que cubren el instante `seconds`."""
+        frame = int(seconds * self.sources[source_id]["fps"])
+        return self.index.covering(source_id, frame)
+
+    def overlaps(self, source_id, start_frame, end_frame):
+        return self.index.overlapping(source_id, start_frame, end_frame)
+
+    def _timeline_offsets(self):
+        """Inicio (en segundos) de cada segmento en la línea de tiempo del proyecto."""
+        if self._offsets is None:
+            offsets = [0.0]
+            for slot in self.timeline:
+                source_id, start, end = self.segments.get(slot)
+                offsets.append(offsets[-1] + (end - start) / self.sources[source_id]["fps"])
+            self._offsets = offsets
+        return self._offsets
+
+    def duration(self):
+        return self._timeline_offsets()[-1]
+
+    def segment_at_timeline(self, seconds):
+        """Ranura que se reproduce en el instante `seconds` de la línea de tiempo, o None."""
+        offsets = self._timeline_offsets()
+        i = bisect.bisect_right(offsets, seconds) - 1
+        if 0 <= i < len(self.timeline):
+            return self.timeline[i]
+        return None
+
+    def cortes(self):
+        """Lista de (archivo, inicio, duración) en segundos, en el orden de la línea de tiempo."""
+        result = []
+        for slot in self.timeline:
+            source_id, start, end = self.segments.get(slot)
+            source = self.sources[source_id]
+            result.append((source["path"], start / source["fps"], (end - start) / source["fps"]))
+        return result
+
+    # Guardado y carga
+
+    def to_dict(self):
+        return {
+            "version": PROJECT_VERSION,
+            "sources": self.sources,
+            "segments": [list(self.segments.get(slot)) for slot in self.timeline],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != PROJECT_VERSION:
+            raise ValueError(f"Versión de proyecto no soportada: {data.get('version')}")
+        project = cls()
+        project.sources = data["sources"]
+        for source_id, start, end in data["segments"]:
+            project.add_segment(source_id, start, end)
+        return project
+
+    def save(self, path):
+        """Guarda el proyecto en JSON o, si la extensión es .aspj, en binario."""
+        if path.endswith(".aspj"):
+            self._save_binary(path)
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith(".aspj"):
+            return cls._load_binary(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def _save_binary(self, path):
+        # Cabecera fija + orígenes en JSON + columnas de segmentos en bruto
+        header = json.dumps({"sources": self.sources}).encode("utf-8")
+        columns = [array("i", (getattr(self.segments, name)[slot] for slot in self.timeline))
+                   for name in ("source", "start", "end")]
+        if sys.byteorder == "big":
+            for column in columns:
+                column.byteswap()  # Las columnas se guardan en little-endian, como la cabecera
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(BINARY_MAGIC, PROJECT_VERSION, len(self.timeline), len(header)))
+            f.write(header)
+            for column in columns:
+                column.tofile(f)
+
+    @classmethod
+    def _load_binary(cls, path):
+        with open(path, "rb") as f:
+            magic, version, count, header_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != BINARY_MAGIC or version != PROJECT_VERSION:
+                raise ValueError(f"Archivo de proyecto no válido: {path}")
+            project = cls()
+            project.sources = json.loads(f.read(header_len).decode("utf-8"))["sources"]
+            for name in ("source", "start", "end"):
+                column = array("i")
+                try:
+                    column.fromfile(f, count)
+                except EOFError:
+                    raise ValueError(f"Archivo de proyecto truncado: {path}")
+                if sys.byteorder == "big":
+                    column.byteswap()
+                setattr(project.segments, name, column)
+        if any(not 0 <= source < len(project.sources) for source in project.segments.source):
+            raise ValueError(f"Archivo de proyecto con orígenes inexistentes: {path}")
+        project.timeline = list(range(count))
+        project.segments.version += 1
+        return project
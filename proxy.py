@@ -0,0 +1,104 @@
+import os
+import subprocess
+import time
+
+import instrument
+import media_cache
+from media_info import ffmpeg_exe, probe
+
+PROXY_HEIGHT = 400  # Altura del proxy (la de la previsualización)
+PROXY_GOP = 10  # Fotograma clave cada PROXY_GOP fotogramas
+PROXY_CACHE_BYTES = 2 * 1024 * 1024 * 1024  # Tamaño máximo de la caché de proxies
+
+
+def proxy_path(video_path):
+    """Ruta del proxy en caché correspondiente a `video_path`."""
+    return media_cache.cache_path("proxy", video_path, ".mp4")
+
+
+def proxy_keyframes(frame_count):
+    """Fotogramas clave del proxy: GOP fijo sin cortes de escena."""
+    return list(range(0, frame_count, PROXY_GOP))
+
+
+def evict_proxies(max_bytes=PROXY_CACHE_BYTES, keep=None):
+    """Elimina los proxies usados hace más tiempo hasta respetar `max_bytes`."""
+    folder = media_cache.cache_dir("proxy")
+    entries = []
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if name.endswith(".mp4") and ".tmp" not in name and os.path.isfile(path):
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            instrument.info("Proxy eliminado de la caché: %s", path)
+        except OSError:
+            pass
+
+
+def build_proxy(video_path, token=None, max_bytes=PROXY_CACHE_BYTES):
+    """
+    Devuelve la ruta de un proxy de baja resolución y GOP corto para
+    previsualizar `video_path`, generándolo con FFmpeg si no está en caché.
+
+    Si el original ya no es más alto que el proxy se devuelve `video_path`
+    sin generar nada. Devuelve None si `token` se cancela antes de terminar.
+    """
+    info = probe(video_path)
+    height = info.width if info.rotation in (90, 270) else info.height  # Altura tras girar
+    if 0 < height <= PROXY_HEIGHT:
+        return video_path
+
+    path = proxy_path(video_path)
+    if os.path.isfile(path):
+        os.utime(path)  # Marcar como usado recientemente para la expulsión
+        return path
+
+    tmp = path + ".tmp.mp4"
+    cmd = [
+        ffmpeg_exe(),
+        "-y", "-v", "error",
+        "-i", video_path,
+        "-map", "0:v:0",
+        "-an",  # La previsualización no usa audio
+        "-vf", f"scale=-2:{PROXY_HEIGHT}",
+        "-fps_mode", "passthrough",  # Mantener la numeración de fotogramas del original
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-tune", "fastdecode",
+        "-crf", "26",
+        "-g", str(PROXY_GOP), "-keyint_min", str(PROXY_GOP), "-sc_threshold", "0",
+        tmp,
+    ]
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    while True:
+        try:
+            _, stderr = proceso.communicate(timeout=0.2)
+            break
+        except subprocess.TimeoutExpired:
+            if token is not None and token.cancelled:
+                proceso.terminate()
+                proceso.wait()
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                return None
+
+    if proceso.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise RuntimeError(f"Error al generar el proxy: {stderr}")
+
+    instrument.record("ffmpeg", time.perf_counter() - inicio)
+    os.replace(tmp, path)
+    evict_proxies(max_bytes, keep=path)
+    return path
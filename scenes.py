@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+
+import media_cache
+
+SCENES_VERSION = 2
+ANALYSIS_SIZE = (64, 36)  # Tamaño reducido al que se analizan los fotogramas
+SAMPLE_FPS = 8  # Fotogramas muestreados por segundo de video; el resto se salta con grab()
+BATCH = 64  # Fotogramas por lote en los cálculos vectorizados
+HIST_BINS = 8  # Niveles por canal del histograma de color (8x8x8)
+THRESHOLD = 0.35  # Puntuación mínima para considerar un corte
+MIN_SCENE_SECONDS = 0.5  # Separación mínima entre cortes
+
+
+def scene_scores(frames, previous=None):
+    """
+    Puntuación de cambio de escena de cada fotograma respecto al anterior.
+
+    Combina la distancia L1 entre histogramas de color y la diferencia media
+    absoluta de píxeles, ambas en [0, 1]. `frames` es un lote (N, alto, ancho, 3)
+    de uint8 y `previous` el último fotograma del lote anterior.
+
+    Retorna:
+        numpy.ndarray: N puntuaciones (la primera es 0 si no hay `previous`).
+    """
+    if previous is not None:
+        frames = np.concatenate([previous[None], frames])
+    n = len(frames)
+    bins = HIST_BINS ** 3
+
+    # Histograma de todos los fotogramas del lote con un único bincount
+    q = (frames // (256 // HIST_BINS)).astype(np.int32)
+    codes = (q[..., 0] * HIST_BINS + q[..., 1]) * HIST_BINS + q[..., 2]
+    codes += (np.arange(n, dtype=np.int32) * bins)[:, None, None]
+    hist = np.bincount(codes.ravel(), minlength=n * bins).reshape(n, bins).astype(np.float32)
+    hist /= codes[0].size
+    hist_dist = 0.5 * np.abs(hist[1:] - hist[:-1]).sum(axis=1)
+
+    pixel_diff = np.abs(frames[1:].astype(np.int16) - frames[:-1]).mean(axis=(1, 2, 3)) / 255.0
+    scores = 0.5 * hist_dist + 0.5 * pixel_diff
+    if previous is None:
+        scores = np.concatenate([[0.0], scores])
+    return scores
+
+
+def _refine_cut(cap, cut, step):
+    """
+    Fotograma exacto de un corte detectado en el muestreo: analiza todos los
+    fotogramas entre la muestra anterior (`cut - step`) y `cut` y devuelve el
+    de mayor cambio respecto a su predecesor.
+    """
+    first = max(0, cut - step)
+    if cut - first < 2:
+        return cut
+    width, height = ANALYSIS_SIZE
+    frames = np.empty((cut - first + 1, height, width, 3), dtype=np.uint8)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    count = 0
+    while count < len(frames):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        cv2.resize(frame, ANALYSIS_SIZE, dst=frames[count], interpolation=cv2.INTER_AREA)
+        count += 1
+    if count < 2:
+        return cut
+    scores = scene_scores(frames[:count])
+    return first + 1 + int(np.argmax(scores[1:]))
+
+
+def detect_scenes(video_path, token=None, threshold=THRESHOLD, sample_fps=SAMPLE_FPS):
+    """
+    Detecta los cortes de escena de `video_path`.
+
+    Solo se convierten y reducen `sample_fps` fotogramas por segundo; los
+    intermedios se saltan con `grab()`. Cada corte encontrado en el muestreo
+    se refina después analizando los fotogramas intermedios, para devolver el
+    primer fotograma exacto de la escena nueva.
+
+    Retorna:
+        list: Fotogramas donde empieza cada escena nueva, o None si `token` se cancela.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"No se pudo abrir el video: {video_path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        step = max(1, int(round(fps / sample_fps)))
+        min_gap = int(MIN_SCENE_SECONDS * fps)
+        width, height = ANALYSIS_SIZE
+
+        batch = np.empty((BATCH, height, width, 3), dtype=np.uint8)
+        numbers = []
+        previous = None
+        candidates = []
+        frame_no = 0
+        ended = False
+        while not ended:
+            if token is not None and token.cancelled:
+                return None
+            count = 0
+            numbers.clear()
+            while count < BATCH:
+                ret, frame = cap.read()
+                if not ret:
+                    ended = True
+                    break
+                cv2.resize(frame, ANALYSIS_SIZE, dst=batch[count], interpolation=cv2.INTER_AREA)
+                numbers.append(frame_no)
+                count += 1
+                # Saltar los intermedios: grab() los decodifica igualmente, pero sin convertir ni reducir
+                for _ in range(step - 1):
+                    if not cap.grab():
+                        ended = True
+                        break
+                frame_no += step
+                if ended:
+                    break
+            if not count:
+                break
+
+            scores = scene_scores(batch[:count], previous)
+            candidates.extend(numbers[i] for i in np.flatnonzero(scores > threshold) if numbers[i] != 0)
+            previous = batch[count - 1].copy()
+
+        cuts = []
+        for candidate in candidates:
+            if token is not None and token.cancelled:
+                return None
+            cut = _refine_cut(cap, candidate, step) if step > 1 else candidate
+            if not cuts or cut - cuts[-1] >= min_gap:
+                cuts.append(cut)
+        return cuts
+    finally:
+        cap.release()
+
+
+def load_scene_cuts(video_path, token=None):
+    """Cortes de escena de `video_path`, desde la caché o detectados y guardados en ella."""
+    cache_file = media_cache.cache_path("scenes", video_path, ".json")
+    data = media_cache.load_json(cache_file)
+    if data and data.get("version") == SCENES_VERSION and data.get("threshold") == THRESHOLD:
+        return data["cuts"]
+
+    cuts = detect_scenes(video_path, token)
+    if cuts is not None:
+        media_cache.save_json(cache_file, {"version": SCENES_VERSION, "threshold": THRESHOLD, "cuts": cuts})
+    return cuts
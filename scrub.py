@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import instrument
+from decoder import open_decoder
+from playback import PREVIEW_SIZE
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024  # Presupuesto de memoria de la caché de fotogramas
+
+
+class FrameCache:
+    """Caché LRU de fotogramas ya preparados, acotada por un presupuesto en bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, frame_no):
+        with self.lock:
+            frame = self.frames.get(frame_no)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.frames.move_to_end(frame_no)
+            self.hits += 1
+            return frame
+
+    def peek(self, frame_no):
+        """Como `get` pero sin contar aciertos ni fallos."""
+        with self.lock:
+            return self.frames.get(frame_no)
+
+    def put(self, frame_no, frame):
+        with self.lock:
+            old = self.frames.pop(frame_no, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self.frames[frame_no] = frame
+            self.bytes += frame.nbytes
+            # Expulsar los menos usados hasta respetar el presupuesto
+            while self.bytes > self.max_bytes and len(self.frames) > 1:
+                _, evicted = self.frames.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.bytes = 0
+
+
+class ScrubPreview:
+    """
+    Previsualización en vivo mientras se arrastran los manejadores.
+
+    Usa un decodificador propio (del mismo backend que la reproducción) y un
+    único hilo; las peticiones se agrupan de modo que solo se decodifica la
+    posición más reciente solicitada.
+    """
+
+    def __init__(self, video_path, on_frame, cache_bytes=DEFAULT_CACHE_BYTES, size=PREVIEW_SIZE, decoder=None):
+        self.video_path = video_path
+        self.on_frame = on_frame  # Llamado como on_frame(frame_no, rgb) desde el hilo de trabajo
+        self.size = size
+        self.backend = decoder  # "cv2", "ffmpeg" o None para DEFAULT_DECODER
+        self.cache = FrameCache(cache_bytes)
+        self.seek_index = None
+        self.pending = None
+        self.coalesced = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def request(self, frame_no):
+        """Solicita el fotograma `frame_no`; reemplaza cualquier petición pendiente."""
+        frame = self.cache.get(frame_no)
+        if frame is not None:
+            self.on_frame(frame_no, frame)
+            return
+        with self.cond:
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = frame_no
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+    def _decode(self, decoder, frame_no):
+        decoder.seek(frame_no, self.seek_index)
+        width, height = self.size
+        frame = np.empty((height, width, 3), dtype=np.uint8)  # Cada fotograma queda en la caché
+        return frame if decoder.read_into(frame) else None
+
+    def _run(self):
+        decoder = None
+        try:
+            decoder = open_decoder(self.video_path, self.size, self.backend)
+            while True:
+                with self.cond:
+                    while self.pending is None and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        return
+                    frame_no, self.pending = self.pending, None
+
+                # `request` ya contó el fallo; puede haberse guardado entre tanto
+                frame = self.cache.peek(frame_no)
+                if frame is None:
+                    started = time.perf_counter()
+                    frame = self._decode(decoder, frame_no)
+                    instrument.record("scrub", time.perf_counter() - started)
+                    if frame is None:
+                        continue
+                    self.cache.put(frame_no, frame)
+                self.on_frame(frame_no, frame)
+        except Exception as e:
+            instrument.error("Error en la previsualización de arrastre: %s", e)
+        finally:
+            if decoder:
+                decoder.release()
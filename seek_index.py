@@ -0,0 +1,140 @@
+import bisect
+import subprocess
+
+import cv2
+
+import media_cache
+from media_info import ffmpeg_exe
+
+INDEX_VERSION = 1
+
+
+class SeekIndex:
+    """
+    Índice de búsqueda de un video: PTS de cada fotograma (en orden de
+    presentación) y tabla de fotogramas clave.
+
+    Permite saltar a un fotograma buscando el fotograma clave anterior y
+    decodificando hacia delante sobre la captura ya abierta, sin reabrirla.
+    """
+
+    def __init__(self, pts, keyframes):
+        self.pts = pts  # Segundos de presentación de cada fotograma
+        self.keyframes = keyframes or [0]  # Números de fotograma clave, ordenados
+
+    def __len__(self):
+        return len(self.pts)
+
+    def frame_to_time(self, frame):
+        """Tiempo de presentación (segundos) del fotograma `frame`."""
+        if not self.pts:
+            return 0.0
+        return self.pts[min(max(frame, 0), len(self.pts) - 1)]
+
+    def time_to_frame(self, seconds):
+        """Fotograma que se muestra en el instante `seconds`."""
+        return max(0, bisect.bisect_right(self.pts, seconds) - 1)
+
+    def keyframe_before(self, frame):
+        """Fotograma clave más cercano en o antes de `frame`."""
+        i = bisect.bisect_right(self.keyframes, frame) - 1
+        return self.keyframes[max(i, 0)]
+
+    def seek(self, cap, frame):
+        """Posiciona `cap` en `frame` y devuelve el fotograma alcanzado."""
+        frame = min(max(int(frame), 0), max(len(self.pts) - 1, 0))
+        current = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        key = self.keyframe_before(frame)
+
+        # Si ya estamos dentro del mismo GOP antes del destino basta con avanzar
+        if not key <= current <= frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, key)
+            current = key
+
+        while current < frame and cap.grab():
+            current += 1
+        return current
+
+    def to_dict(self):
+        return {"version": INDEX_VERSION, "pts": self.pts, "keyframes": self.keyframes}
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data or data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["pts"], data["keyframes"])
+
+
+def _parse_framecrc(lines):
+    """Extrae (pts, es_clave) de cada paquete de la salida `-f framecrc` de FFmpeg."""
+    time_base = 1.0
+    packets = []
+    for line in lines:
+        if line.startswith("#tb 0:"):
+            num, den = line.split(":", 1)[1].strip().split("/")
+            time_base = int(num) / int(den)
+            continue
+        if not line or line.startswith("#"):
+            continue
+
+        fields = [f.strip() for f in line.split(",")]
+        if len(fields) < 6 or fields[0] != "0":
+            continue
+        dts, pts = int(fields[1]), int(fields[2])
+        if pts < -(1 << 62):  # AV_NOPTS_VALUE
+            pts = dts
+        flags = next((f for f in fields[6:] if f.startswith("F=")), None)
+        is_key = flags is None or int(flags[2:], 16) & 1
+        packets.append((pts * time_base, bool(is_key)))
+    return packets
+
+
+def build_seek_index(video_path, token=None):
+    """
+    Construye el índice leyendo los paquetes del video con copia de flujo (sin decodificar).
+
+    Devuelve None si `token` se cancela antes de terminar.
+    """
+    cmd = [
+        ffmpeg_exe(),
+        "-v", "error",
+        "-i", video_path,
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "framecrc",
+        "-",
+    ]
+    proceso = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    while True:
+        try:
+            stdout, stderr = proceso.communicate(timeout=0.2)
+            break
+        except subprocess.TimeoutExpired:
+            if token is not None and token.cancelled:
+                proceso.kill()
+                proceso.communicate()
+                return None
+    if proceso.returncode != 0:
+        raise RuntimeError(f"Error al indexar el video: {stderr}")
+
+    # Los paquetes llegan en orden de decodificación; ordenarlos por PTS
+    packets = sorted(_parse_framecrc(stdout.splitlines()))
+    start = packets[0][0] if packets else 0.0
+    pts = [t - start for t, _ in packets]
+    keyframes = [i for i, (_, is_key) in enumerate(packets) if is_key]
+    return SeekIndex(pts, keyframes)
+
+
+def load_seek_index(video_path, token=None):
+    """
+    Devuelve el índice de `video_path`, usando la caché en disco si es válida.
+
+    Devuelve None si `token` se cancela mientras se construye.
+    """
+    cache_file = media_cache.cache_path("seek", video_path, ".json")
+    index = SeekIndex.from_dict(media_cache.load_json(cache_file))
+    if index is None:
+        index = build_seek_index(video_path, token)
+        if index is not None:
+            media_cache.save_json(cache_file, index.to_dict())
+    return index
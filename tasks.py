@@ -0,0 +1,126 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+
+class CancelToken(threading.Event):
+    """Token de cancelación cooperativa; la tarea consulta `cancelled` y termina sola."""
+
+    def cancel(self):
+        self.set()
+
+    @property
+    def cancelled(self):
+        return self.is_set()
+
+
+class Task:
+    """Tarea programada con su categoría, token y estado."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, category, func):
+        self.id = next(self._ids)
+        self.category = category
+        self.name = getattr(func, "__name__", repr(func))
+        self.token = CancelToken()
+        self.state = "en cola"  # en cola, activa, hecha, cancelada, error
+        self.created = time.perf_counter()
+        self.started = None
+        self.future = None
+
+
+class TaskScheduler:
+    """
+    Planificador con un grupo fijo de hilos.
+
+    Cada tarea pertenece a una categoría (seek, play, load...) y al enviar una
+    nueva se cancela la anterior de la misma categoría: si aún estaba en cola
+    no llega a ejecutarse y si ya corría recibe la cancelación por su token.
+
+    Las categorías de `background` (análisis largos como índice, escenas o
+    proxy) van a un grupo de hilos propio, para que nunca ocupen los hilos de
+    las tareas interactivas.
+    """
+
+    def __init__(self, workers=4, background=(), background_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tarea")
+        self.background = frozenset(background)
+        self.background_executor = ThreadPoolExecutor(max_workers=background_workers, thread_name_prefix="fondo")
+        self.lock = threading.Lock()
+        self.latest = {}  # categoría -> última tarea enviada
+        self.tasks = {}  # id -> tarea en cola o activa
+
+    def submit(self, category, func, *args, **kwargs):
+        """Envía `func(token, *args, **kwargs)` cancelando la tarea previa de `category`."""
+        task = Task(category, func)
+        with self.lock:
+            previous = self.latest.get(category)
+            if previous:
+                previous.token.cancel()
+                if previous.future.cancel():
+                    previous.state = "cancelada"
+                    self.tasks.pop(previous.id, None)
+            self.latest[category] = task
+            self.tasks[task.id] = task
+            executor = self.background_executor if category in self.background else self.executor
+            task.future = executor.submit(self._run, task, func, args, kwargs)
+        return task
+
+    def cancel(self, category):
+        """Cancela la última tarea de `category`, si la hay."""
+        with self.lock:
+            task = self.latest.get(category)
+        if task:
+            task.token.cancel()
+            if task.future.cancel():
+                task.state = "cancelada"
+                with self.lock:
+                    self.tasks.pop(task.id, None)
+
+    def _run(self, task, func, args, kwargs):
+        if task.token.cancelled:
+            task.state = "cancelada"
+        else:
+            task.state = "activa"
+            task.started = time.perf_counter()
+            try:
+                func(task.token, *args, **kwargs)
+                task.state = "cancelada" if task.token.cancelled else "hecha"
+            except Exception as e:
+                task.state = "error"
+                instrument.error("Error en la tarea %s/%s: %s", task.category, task.name, e)
+        with self.lock:
+            self.tasks.pop(task.id, None)
+
+    def snapshot(self):
+        """Vista de depuración de las tareas activas y en cola."""
+        now = time.perf_counter()
+        with self.lock:
+            tasks = list(self.tasks.values())
+        return [
+            {
+                "id": t.id,
+                "category": t.category,
+                "name": t.name,
+                "state": t.state,
+                "age_ms": (now - t.created) * 1000,
+                "running_ms": (now - t.started) * 1000 if t.started else 0.0,
+            }
+            for t in tasks
+        ]
+
+    def shutdown(self, wait=False):
+        """Cancela todas las tareas (en cola y activas) y detiene el grupo de hilos."""
+        with self.lock:
+            tasks = list(self.tasks.values()) + list(self.latest.values())
+        for task in tasks:
+            task.token.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.background_executor.shutdown(wait=False, cancel_futures=True)
+        if wait:
+            self.executor.shutdown(wait=True)
+            self.background_executor.shutdown(wait=True)
@@ -0,0 +1,127 @@
+import bisect
+
+MAX_PIXELS_PER_FRAME = 8  # Zoom máximo: un fotograma ocupa como mucho 8 píxeles
+SNAP_PIXELS = 6  # Distancia a la que un manejador se ajusta a un corte de escena
+
+
+class TimelineModel:
+    """
+    Modelo de la línea de tiempo con zoom y desplazamiento.
+
+    Las posiciones se manejan en fotogramas; la vista es el intervalo
+    [view_start, view_start + view_frames) que se dibuja en `width` píxeles.
+    `version` cambia cada vez que la vista cambia, para redibujar solo entonces.
+    """
+
+    def __init__(self, width=800):
+        self.width = width
+        self.frame_count = 1
+        self.fps = 30.0
+        self.view_start = 0.0
+        self.view_frames = 1.0
+        self.keyframes = []
+        self.scene_cuts = []  # Fotogramas de los cortes de escena, ordenados
+        self.pts = None  # Función fotograma -> segundos del índice de búsqueda
+        self.version = 0
+
+    def set_media(self, info):
+        """Reinicia el modelo para un video nuevo (`MediaInfo`) con la vista completa."""
+        self.frame_count = info.frame_count
+        self.fps = info.fps
+        self.keyframes = []
+        self.scene_cuts = []
+        self.pts = None
+        self.reset_view()
+
+    def set_index(self, index):
+        """Usa los PTS, los fotogramas clave y el número real de fotogramas del índice."""
+        full = not self.zoomed
+        self.frame_count = max(1, len(index))
+        self.keyframes = index.keyframes
+        self.pts = index.frame_to_time
+        if full:
+            self.reset_view()
+        else:
+            self._clamp_view()
+
+    def reset_view(self):
+        self.view_start = 0.0
+        self.view_frames = float(self.frame_count)
+        self.version += 1
+
+    @property
+    def zoomed(self):
+        return self.view_frames < self.frame_count
+
+    # Conversión de coordenadas
+
+    def frame_to_x(self, frame):
+        return (frame - self.view_start) * self.width / self.view_frames
+
+    def x_to_frame(self, x, last=None):
+        """Fotograma bajo la coordenada `x`, redondeado y limitado a [0, last]."""
+        last = self.frame_count - 1 if last is None else last
+        frame = int(round(self.view_start + x * self.view_frames / self.width))
+        return min(max(frame, 0), last)
+
+    def frame_to_time(self, frame):
+        if not self.pts:
+            return frame / self.fps
+        if frame >= self.frame_count:
+            # Final exclusivo: el último fotograma más su duración nominal
+            return self.pts(self.frame_count - 1) + (frame - self.frame_count + 1) / self.fps
+        return self.pts(frame)
+
+    def visible_seconds(self):
+        """Intervalo visible en segundos."""
+        return self.view_start / self.fps, (self.view_start + self.view_frames) / self.fps
+
+    # Zoom y desplazamiento
+
+    def zoom(self, factor, anchor_x):
+        """Acerca (`factor` > 1) o aleja la vista manteniendo fijo el fotograma bajo `anchor_x`."""
+        anchor = self.view_start + anchor_x * self.view_frames / self.width
+        min_frames = min(self.frame_count, self.width / MAX_PIXELS_PER_FRAME)
+        view_frames = min(max(self.view_frames / factor, min_frames), float(self.frame_count))
+        if view_frames == self.view_frames:
+            return False
+        self.view_frames = view_frames
+        self.view_start = anchor - anchor_x * view_frames / self.width
+        self._clamp_view()
+        return True
+
+    def pan(self, dx):
+        """Desplaza la vista `dx` píxeles (positivo: hacia la derecha del video)."""
+        start = self.view_start
+        self.view_start += dx * self.view_frames / self.width
+        self._clamp_view()
+        return self.view_start != start
+
+    def _clamp_view(self):
+        self.view_frames = min(self.view_frames, float(self.frame_count))
+        self.view_start = min(max(0.0, self.view_start), self.frame_count - self.view_frames)
+        self.version += 1
+
+    # Ajuste
+
+    def nearest_keyframe(self, frame):
+        if not self.keyframes:
+            return frame
+        i = bisect.bisect_left(self.keyframes, frame)
+        candidates = self.keyframes[max(0, i - 1):i + 1]
+        return min(candidates, key=lambda k: abs(k - frame))
+
+    def snap(self, frame, keyframes=False):
+        """
+        Ajusta `frame` a un fotograma clave (si `keyframes`) o al corte de escena
+        más cercano si está a menos de `SNAP_PIXELS` en la vista actual.
+        """
+        if keyframes and self.keyframes:
+            return self.nearest_keyframe(frame)
+        if self.scene_cuts:
+            i = bisect.bisect_left(self.scene_cuts, frame)
+            candidates = self.scene_cuts[max(0, i - 1):i + 1]
+            cut = min(candidates, key=lambda c: abs(c - frame))
+            if abs(cut - frame) * self.width / self.view_frames <= SNAP_PIXELS:
+                return cut
+        return frame
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import deque
+
+import instrument
+
+
+class UIDispatcher:
+    """
+    Capa de despacho hacia el hilo de Tk.
+
+    Los hilos de trabajo publican actualizaciones con `post()`; el hilo de Tk
+    las ejecuta todas juntas en un único tick de `root.after`. Las
+    actualizaciones con la misma `key` se agrupan y solo se ejecuta la más
+    reciente (por ejemplo, el último fotograma pendiente de dibujar).
+    """
+
+    def __init__(self, root, interval_ms=8):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.lock = threading.Lock()
+        self.pending = deque()  # (instante, función, argumentos) en orden de llegada
+        self.keyed = {}  # clave -> (instante, función, argumentos)
+        self.posted = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.latency_avg = 0.0  # Segundos entre post() y la ejecución (media móvil)
+        self.latency_max = 0.0
+        self.root.after(self.interval_ms, self._drain)
+
+    def post(self, func, *args, key=None):
+        """Programa `func(*args)` en el hilo de Tk; seguro desde cualquier hilo."""
+        entry = (time.perf_counter(), func, args)
+        with self.lock:
+            self.posted += 1
+            if key is None:
+                self.pending.append(entry)
+            else:
+                if key in self.keyed:
+                    self.coalesced += 1
+                self.keyed[key] = entry
+
+    def _drain(self):
+        with self.lock:
+            batch = list(self.pending) + list(self.keyed.values())
+            self.pending.clear()
+            self.keyed.clear()
+
+        now = time.perf_counter()
+        for posted_at, func, args in batch:
+            latency = now - posted_at
+            self.latency_avg = latency if not self.executed else 0.9 * self.latency_avg + 0.1 * latency
+            self.latency_max = max(self.latency_max, latency)
+            self.executed += 1
+            try:
+                func(*args)
+            except Exception as e:
+                instrument.error("Error en actualización de la interfaz: %s", e)
+        self.root.after(self.interval_ms, self._drain)
+
+    def stats(self):
+        """Contadores de la cola: publicadas, ejecutadas, agrupadas y latencia."""
+        with self.lock:
+            queued = len(self.pending) + len(self.keyed)
+        return {
+            "posted": self.posted,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "queued": queued,
+            "latency_ms_avg": self.latency_avg * 1000,
+            "latency_ms_max": self.latency_max * 1000,
+        }
@@ -0,0 +1,170 @@
+import os
+import subprocess
+
+import numpy as np
+
+import media_cache
+from media_info import ffmpeg_exe
+
+SAMPLE_RATE = 8000  # Frecuencia a la que FFmpeg remuestrea el audio (mono)
+BASE_BUCKET = 128  # Muestras por pico en el nivel más detallado (62,5 picos por segundo)
+CHUNK_BUCKETS = 4096  # Picos calculados por cada lectura del pipe
+MIN_LEVEL_PEAKS = 256  # No se generan niveles más gruesos que este número de picos
+WAVEFORM_COLOR = (0, 200, 120, 170)  # RGBA de la forma de onda sobre la línea de tiempo
+
+
+def _chunk_peaks(samples, bucket):
+    """Mínimo y máximo de cada grupo de `bucket` muestras (el último puede ser incompleto)."""
+    full = len(samples) // bucket * bucket
+    blocks = samples[:full].reshape(-1, bucket)
+    mins, maxs = blocks.min(axis=1), blocks.max(axis=1)
+    if full < len(samples):
+        mins = np.append(mins, samples[full:].min())
+        maxs = np.append(maxs, samples[full:].max())
+    return mins, maxs
+
+
+def _downsample(mins, maxs):
+    """Nivel siguiente de la pirámide: cada pico combina dos del nivel anterior."""
+    n = len(mins) // 2 * 2
+    coarse_min = np.minimum(mins[:n:2], mins[1:n:2])
+    coarse_max = np.maximum(maxs[:n:2], maxs[1:n:2])
+    if n < len(mins):
+        coarse_min = np.append(coarse_min, mins[-1])
+        coarse_max = np.append(coarse_max, maxs[-1])
+    return coarse_min, coarse_max
+
+
+class Waveform:
+    """
+    Picos de audio en varias resoluciones.
+
+    `levels[0]` guarda el mínimo y máximo de cada `BASE_BUCKET` muestras y cada
+    nivel siguiente reduce a la mitad el número de picos, de modo que cualquier
+    nivel de zoom se dibuja a partir de pocos miles de valores.
+    """
+
+    def __init__(self, levels, sample_rate=SAMPLE_RATE, base_bucket=BASE_BUCKET):
+        self.levels = levels  # [(mins, maxs)] de int16, del más fino al más grueso
+        self.sample_rate = sample_rate
+        self.base_bucket = base_bucket
+
+    @property
+    def duration(self):
+        return len(self.levels[0][0]) * self.base_bucket / self.sample_rate
+
+    def peaks(self, width, start=0.0, end=None):
+        """
+        Mínimo y máximo por columna para dibujar [start, end) segundos en `width` píxeles.
+
+        Usa el nivel más grueso que aún tenga al menos un pico por columna.
+        """
+        end = self.duration if end is None else end
+        per_second = self.sample_rate / self.base_bucket
+        level = 0
+        while (level + 1 < len(self.levels)
+               and (end - start) * per_second / 2 ** (level + 1) >= width):
+            level += 1
+        mins, maxs = self.levels[level]
+        scale = per_second / 2 ** level
+        first = min(int(start * scale), len(mins) - 1)
+        last = max(first + 1, min(len(mins), int(np.ceil(end * scale))))
+        starts = np.linspace(first, last, width + 1)[:-1].astype(np.intp)
+        starts = np.minimum(starts, last - 1)  # Columnas sin pico propio repiten el anterior
+        col_min = np.minimum.reduceat(mins[:last], starts)
+        col_max = np.maximum.reduceat(maxs[:last], starts)
+        return col_min, col_max
+
+    def render(self, width, height, start=0.0, end=None, color=WAVEFORM_COLOR):
+        """Imagen RGBA (alto, ancho, 4) con la forma de onda centrada y fondo transparente."""
+        col_min, col_max = self.peaks(width, start, end)
+        half = height / 2
+        top = (half - col_max.astype(np.float32) / 32768 * half).astype(np.int32)
+        bottom = (half - col_min.astype(np.float32) / 32768 * half).astype(np.int32)
+        rows = np.arange(height, dtype=np.int32)[:, None]
+        image = np.zeros((height, width, 4), dtype=np.uint8)
+        image[(rows >= top) & (rows <= bottom)] = color
+        return image
+
+    def save(self, path):
+        arrays = {}
+        for i, (mins, maxs) in enumerate(self.levels):
+            arrays[f"min{i}"] = mins
+            arrays[f"max{i}"] = maxs
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, sample_rate=self.sample_rate, base_bucket=self.base_bucket, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            count = sum(1 for name in data.files if name.startswith("min"))
+            levels = [(data[f"min{i}"], data[f"max{i}"]) for i in range(count)]
+            return cls(levels, int(data["sample_rate"]), int(data["base_bucket"]))
+
+
+def extract_waveform(video_path, token=None, sample_rate=SAMPLE_RATE, bucket=BASE_BUCKET):
+    """
+    Extrae los picos de audio leyendo PCM de FFmpeg por un pipe.
+
+    El PCM se lee en bloques de tamaño fijo sobre un único búfer reutilizado,
+    así que la memoria usada no depende de la duración del archivo.
+
+    Retorna:
+        Waveform: Picos en varias resoluciones, o None si no hay audio o se cancela.
+    """
+    cmd = [
+        ffmpeg_exe(),
+        "-v", "error",
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "s16le", "pipe:1",
+    ]
+    proceso = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    buffer = np.empty(bucket * CHUNK_BUCKETS, dtype=np.int16)
+    view = memoryview(buffer).cast("B")
+    mins, maxs = [], []
+    try:
+        while True:
+            if token is not None and token.cancelled:
+                proceso.terminate()
+                return None
+            # Llenar el búfer completo salvo al final del flujo
+            filled = 0
+            while filled < len(view):
+                n = proceso.stdout.readinto(view[filled:])
+                if not n:
+                    break
+                filled += n
+            samples = buffer[:filled // 2]
+            if len(samples):
+                chunk_min, chunk_max = _chunk_peaks(samples, bucket)
+                mins.append(chunk_min)
+                maxs.append(chunk_max)
+            if filled < len(view):
+                break
+    finally:
+        proceso.stdout.close()
+        proceso.wait()
+
+    if not mins:
+        return None  # Sin flujo de audio
+    levels = [(np.concatenate(mins), np.concatenate(maxs))]
+    while len(levels[-1][0]) > 2 * MIN_LEVEL_PEAKS:
+        levels.append(_downsample(*levels[-1]))
+    return Waveform(levels, sample_rate, bucket)
+
+
+def load_waveform(video_path, token=None):
+    """Picos de audio de `video_path`, desde la caché o extraídos y guardados en ella."""
+    cache_file = media_cache.cache_path("waveform", video_path, f"_{SAMPLE_RATE}_{BASE_BUCKET}.npz")
+    if os.path.isfile(cache_file):
+        try:
+            return Waveform.load(cache_file)
+        except (OSError, ValueError, KeyError):
+            pass  # Caché dañada: volver a extraer
+
+    waveform = extract_waveform(video_path, token)
+    if waveform is not None:
+        waveform.save(cache_file)
+    return waveform